@@ -0,0 +1,10 @@
+"""tete_utils: helpers for survey data (XLSForm encodings, multi choice question tables and statistical tests)
+
+The submodules are imported on demand so that `import tete_utils` stays cheap:
+    from tete_utils.tete_utils import get_encoding_dict
+    from tete_utils.multi_choice import mr_tab_all, get_mr_tables_by_all
+    from tete_utils.stats_tests import group_tests_batch
+    from tete_utils import profiling  # timing and memory of the hot paths
+scipy and statsmodels are only loaded by stats_tests once a test needs them.
+"""
+__all__ = ["tete_utils", "multi_choice", "stats_tests", "profiling"]
@@ -0,0 +1,357 @@
+"""Benchmarks of the hot paths of tete_utils, the multi choice analyzer and stats_tests
+
+Generates seeded synthetic XLSForms and Kobo style exports (select_multiple questions exported as
+"Question/option" 0/1 columns plus a few banner and numeric columns), times every benchmark and
+records wall time, peak memory (tracemalloc) and throughput in a JSON file. With --baseline the
+results are compared against an earlier JSON file and regressions are flagged. The import time of
+each module is checked against IMPORT_BUDGETS on every run.
+
+Examples:
+    python benchmarks.py --rows 1000 100000 --output baseline.json
+    python benchmarks.py --rows 1000 100000 --baseline baseline.json --threshold 0.2
+    python benchmarks.py --rows 10000000 --questions 5 --only mr_tab
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+import multi_choice as analyzer
+import profiling
+import stats_tests
+import tete_utils
+
+BANNERS = {"Gender": 2, "Region": 8, "Age_group": 5}
+
+# Seconds each module may take to import on top of numpy and pandas, which every module needs anyway
+IMPORT_BUDGETS = {"tete_utils": 0.1, "stats_tests": 0.1, "multi_choice": 0.15}
+
+
+def make_xlsform(file_location:str, n_questions:int=20, n_options:int=10, seed:int=0)->str:
+    """Writes a synthetic XLSForm with a survey and a choices sheet
+
+    Args:
+        file_location (str): xlsx file to write
+        n_questions (int, optional): number of select_multiple questions, each with its own list. Defaults to 20.
+        n_options (int, optional): choices per list. Defaults to 10.
+        seed (int, optional): seed of the generated labels. Defaults to 0.
+
+    Returns:
+        str: file_location
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array(["water", "school", "clinic", "market", "road", "farm", "loan", "phone", "bus", "church", "radio", "shop"])
+    survey = pd.DataFrame({
+        "type": [f"select_multiple list_{i}" for i in range(n_questions)],
+        "name": [f"Q{i}" for i in range(n_questions)],
+        "label": [f"Question {i}" for i in range(n_questions)],
+    })
+    choices = pd.DataFrame({
+        "list_name": np.repeat([f"list_{i}" for i in range(n_questions)], n_options),
+        "name": np.tile(np.arange(1, n_options + 1), n_questions),
+        "label": [f"{' '.join(rng.choice(words, 2))} {j}" for j in range(n_questions * n_options)],
+    })
+    with pd.ExcelWriter(file_location, engine="openpyxl") as writer:
+        survey.to_excel(writer, sheet_name="survey", index=False)
+        choices.to_excel(writer, sheet_name="choices", index=False)
+    return file_location
+
+
+def make_kobo_export(n_rows:int, n_questions:int=20, n_options:int=10, n_scores:int=5, seed:int=0)->pd.DataFrame:
+    """Generates a Kobo style export of select_multiple questions
+
+    Each question is exported as "Q<i>/<option>" uint8 0/1 columns with option popularity falling off
+    like real surveys, next to the banner columns of BANNERS and numeric "score_<k>" columns that
+    shift a little with the Region. Memory is about n_rows * n_questions * n_options bytes.
+
+    Args:
+        n_rows (int): number of submissions
+        n_questions (int, optional): number of select_multiple questions. Defaults to 20.
+        n_options (int, optional): options per question. Defaults to 10.
+        n_scores (int, optional): number of numeric columns. Defaults to 5.
+        seed (int, optional): seed of the data. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: the export
+    """
+    rng = np.random.default_rng(seed)
+    columns: dict[str, np.ndarray] = {}
+    for banner, levels in BANNERS.items():
+        columns[banner] = pd.Categorical.from_codes(rng.integers(0, levels, n_rows), [f"{banner}_{i}" for i in range(levels)])  # type:ignore
+    popularity = 0.6 / np.arange(1, n_options + 1) ** 0.7
+    for i in range(n_questions):
+        answers = rng.random((n_rows, n_options), dtype=np.float32) < popularity
+        for j in range(n_options):
+            columns[f"Q{i}/{j + 1}"] = answers[:, j].view(np.uint8)
+    region = np.asarray(columns["Region"].codes)  # type:ignore
+    for k in range(n_scores):
+        columns[f"score_{k}"] = rng.normal(50 + 0.2 * region, 10, n_rows)
+    return pd.DataFrame(columns)
+
+
+def make_coded_answers(n_rows:int, n_options:int=10, seed:int=0)->pd.Series:
+    """Raw select_multiple answers as Kobo exports them before expansion eg "1 4 7" """
+    rng = np.random.default_rng(seed)
+    unique_answers = np.array([" ".join(map(str, sorted(rng.choice(np.arange(1, n_options + 1), rng.integers(1, 4), replace=False)))) for _ in range(500)])
+    return pd.Series(unique_answers[rng.integers(0, unique_answers.size, n_rows)], name="Q0")
+
+
+class BenchmarkData:
+    """The generated data of one benchmark size, shared by all the benchmarks of that size"""
+    def __init__(self, n_rows:int, n_questions:int, n_options:int, seed:int, workdir:str):
+        self.n_rows = n_rows
+        self.workdir = workdir
+        self.df = make_kobo_export(n_rows, n_questions, n_options, seed=seed)
+        self.prefixes = [f"Q{i}/" for i in range(n_questions)]
+        self.scores = [col for col in self.df.columns if col.startswith("score_")]
+        self.form_path = make_xlsform(os.path.join(workdir, f"form_{n_questions}_{n_options}.xlsx"), n_questions, n_options, seed)
+        self.coded = pd.DataFrame({"Q0": make_coded_answers(n_rows, n_options, seed)})
+        self.n_columns = self.df.shape[1]
+
+
+# Every benchmark takes the data and returns the call to time, so the set up is not timed
+def _cold_cache(call:Callable[[], object])->Callable[[], object]:
+    def run():
+        tete_utils.ExcelCache.clear()
+        return call()
+    return run
+
+
+def _warm_cache(call:Callable[[], object])->Callable[[], object]:
+    call()
+    return call
+
+
+def _save_to_excel(data:BenchmarkData)->Callable[[], object]:
+    table = analyzer.mr_tab(analyzer.filter_data(data.df, data.prefixes[0]))
+    file_location = os.path.join(data.workdir, "save_to_excel.xlsx")
+    def run():
+        if os.path.exists(file_location):
+            os.remove(file_location)
+        analyzer.save_to_excel(table, data.prefixes[0], file_location)
+    return run
+
+
+def _report_writer(data:BenchmarkData)->Callable[[], object]:
+    tables = analyzer.mr_tab_all(data.df, data.prefixes)
+    def run():
+        report = analyzer.ReportWriter(os.path.join(data.workdir, "report.xlsx"))
+        for prefix, table in tables.items():
+            report.add(table, prefix)
+        report.write()
+    return run
+
+
+def _incremental_report(data:BenchmarkData, appended:float)->Callable[[], object]:
+    # The cache is built from all but the last `appended` share of the rows and copied afresh for every run
+    banners = list(BANNERS)
+    snapshot = os.path.join(data.workdir, f"report_cache_{appended}")
+    cache_dir = os.path.join(data.workdir, "report_cache")
+    shutil.rmtree(snapshot, ignore_errors=True)
+    analyzer.incremental_report(data.df.iloc[:data.n_rows - int(data.n_rows * appended)], data.prefixes, banners, snapshot)
+    def run():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        shutil.copytree(snapshot, cache_dir)
+        analyzer.incremental_report(data.df, data.prefixes, banners, cache_dir)
+    return run
+
+
+def _sample(data:BenchmarkData, n:int)->pd.DataFrame:
+    return data.df.iloc[:n]
+
+
+BENCHMARKS: dict[str, Callable[[BenchmarkData], Callable[[], object]]] = {
+    "ExcelCache.get_sheet (cold)": lambda d: _cold_cache(lambda: tete_utils.ExcelCache.get_sheet(d.form_path, "choices")),
+    "ExcelCache.get_sheet (warm)": lambda d: _warm_cache(lambda: tete_utils.ExcelCache.get_sheet(d.form_path, "choices")),
+    "get_encoding_dict (cold)": lambda d: _cold_cache(lambda: tete_utils.get_encoding_dict("list_0", d.form_path)),
+    "get_encoding_dict (warm)": lambda d: _warm_cache(lambda: tete_utils.get_encoding_dict("list_0", d.form_path)),
+    "get_all_encodings (warm)": lambda d: _warm_cache(lambda: tete_utils.get_all_encodings(d.form_path)),
+    "decode_dataframe": lambda d: _warm_cache(lambda: tete_utils.decode_dataframe(d.coded, d.form_path, {"Q0": "list_0"}, select_multiple=["Q0"])),
+    "mr_tab": lambda d: (lambda block: lambda: analyzer.mr_tab(block))(analyzer.filter_data(d.df, d.prefixes[0])),
+    "mr_tab_all": lambda d: lambda: analyzer.mr_tab_all(d.df, d.prefixes),
+    "get_mr_table_by": lambda d: (lambda cols: lambda: analyzer.get_mr_table_by(d.df, "Region", cols))(analyzer.filter_data(d.df, d.prefixes[0]).columns.to_list()),
+    "get_mr_tables_by_all": lambda d: lambda: analyzer.get_mr_tables_by_all(d.df, list(BANNERS), d.prefixes),
+    "get_mr_tables_by_all (significance)": lambda d: lambda: analyzer.get_mr_tables_by_all(d.df, ["Region"], d.prefixes, significance="holm"),
+    "incremental_report (unchanged)": lambda d: _incremental_report(d, 0.0),
+    "incremental_report (1% appended)": lambda d: _incremental_report(d, 0.01),
+    "save_to_excel": _save_to_excel,
+    "ReportWriter.write": _report_writer,
+    "Shapiro__Test_batch": lambda d: lambda: stats_tests.Shapiro__Test_batch(d.df, d.scores),
+    "Kolmogorov_Smirnov_Test_sketch": lambda d: lambda: stats_tests.Kolmogorov_Smirnov_Test_sketch(d.df, d.scores[0], args=(50, 10), verbose=False),
+    "kruskal_wallis_test": lambda d: lambda: stats_tests.kruskal_wallis_test(d.df, d.scores[0], "Region", verbose=False),
+    "group_tests_batch": lambda d: lambda: stats_tests.group_tests_batch(d.df, d.scores, list(BANNERS)),
+    "chi2_independence_test": lambda d: lambda: stats_tests.chi2_independence_test(d.df, "Region", "Age_group", verbose=False),
+    "pairwise_chi2_test": lambda d: lambda: stats_tests.pairwise_chi2_test(d.df, "Region", "Age_group", verbose=False),
+    "posthoc_pairwise (dunn)": lambda d: lambda: stats_tests.posthoc_pairwise(d.df, d.scores[0], "Region", method="dunn"),
+    "Fisher_2sam (R x C, 200 rows)": lambda d: (lambda sample: lambda: stats_tests.Fisher_2sam(sample, "Gender", "Age_group", verbose=False, seed=0))(_sample(d, 200)),
+    "Ttest_2sam_resampling (200 resamples)": lambda d: (lambda sample: lambda: stats_tests.Ttest_2sam_resampling(sample, d.scores[0], d.scores[1], n_resamples=200, seed=0, verbose=False))(_sample(d, 100_000)),
+}
+
+
+def measure(call:Callable[[], object], repeat:int=3)->dict[str, float]:
+    """Times call repeat times after one warm up run, then runs it once more under tracemalloc for the peak memory
+
+    Returns:
+        dict[str, float]: best and median wall time in seconds and peak traced memory in bytes
+    """
+    call()  # Warm up, eg the first call of a stats_tests function imports scipy
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "median_seconds": statistics.median(times), "peak_memory_bytes": peak}
+
+
+def measure_import_time(module:str, repeat:int=3)->float:
+    """Best time in seconds to import module in a fresh interpreter, on top of importing numpy and pandas"""
+    code = f"import numpy, pandas, time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return min(times)
+
+
+def check_import_budgets(repeat:int=3, verbose:bool=True)->list[dict]:
+    """Measures the import time of every module of IMPORT_BUDGETS
+
+    Returns:
+        list[dict]: one record per module with its seconds, budget and an "over_budget" flag
+    """
+    records = []
+    for module, budget in IMPORT_BUDGETS.items():
+        seconds = measure_import_time(module, repeat)
+        records.append({"module": module, "seconds": seconds, "budget_seconds": budget, "over_budget": seconds > budget})
+        if verbose:
+            print(f"{'OVER BUDGET' if seconds > budget else 'ok':<11} import {module:<30} {seconds:>8.4f}s  budget {budget:.2f}s")
+    return records
+
+
+def run_benchmarks(rows:list[int], n_questions:int=20, n_options:int=10, repeat:int=3, only:list[str]|None=None, seed:int=0, verbose:bool=True)->dict:
+    """Runs the benchmarks for every number of rows
+
+    Args:
+        rows (list[int]): sizes of the generated exports eg [1_000, 100_000]
+        n_questions (int, optional): select_multiple questions in the export. Defaults to 20.
+        n_options (int, optional): options per question. Defaults to 10.
+        repeat (int, optional): timed runs per benchmark, the best one is kept. Defaults to 3.
+        only (list[str] | None, optional): run only the benchmarks whose name contains one of these. Defaults to all.
+        seed (int, optional): seed of the generated data. Defaults to 0.
+        verbose (bool, optional): print each result as it comes. Defaults to True.
+
+    Returns:
+        dict: {"meta": ..., "results": [one record per benchmark and size]}
+    """
+    names = [name for name in BENCHMARKS if not only or any(part in name for part in only)]
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_rows in rows:
+            data = BenchmarkData(n_rows, n_questions, n_options, seed, workdir)
+            for name in names:
+                timing = measure(BENCHMARKS[name](data), repeat)
+                record = {"name": name, "rows": n_rows, "columns": data.n_columns, **timing,
+                          "rows_per_second": n_rows / timing["seconds"] if timing["seconds"] > 0 else float("inf")}
+                results.append(record)
+                if verbose:
+                    print(f"{name:<42} rows={n_rows:<10} {timing['seconds']:>10.4f}s  peak={timing['peak_memory_bytes'] / 1024 ** 2:>9.1f}MB  {record['rows_per_second']:>14,.0f} rows/s")
+            del data
+            tete_utils.ExcelCache.clear()
+    meta = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "questions": n_questions,
+        "options": n_options,
+        "repeat": repeat,
+        "seed": seed,
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(results:dict, baseline:dict, threshold:float=0.2, min_seconds:float=0.001)->list[dict]:
+    """Compares the results with a baseline run of the same benchmarks
+
+    Args:
+        results (dict): output of run_benchmarks
+        baseline (dict): earlier output of run_benchmarks
+        threshold (float, optional): relative slow down (or memory growth) that counts as a regression. Defaults to 0.2.
+        min_seconds (float, optional): slow downs smaller than this are timer noise and never flagged. Defaults to 0.001.
+
+    Returns:
+        list[dict]: one record per benchmark found in both runs, with the ratios and a "regression" flag
+    """
+    previous = {(record["name"], record["rows"]): record for record in baseline["results"]}
+    comparison = []
+    for record in results["results"]:
+        before = previous.get((record["name"], record["rows"]))
+        if before is None:
+            continue
+        comparison.append({"name": record["name"], "rows": record["rows"], **profiling.compare_timings(record, before, threshold, min_seconds)})
+    return comparison
+
+
+def main(argv:list[str]|None=None)->int:
+    parser = argparse.ArgumentParser(description="Benchmarks of tete_utils, the multi choice analyzer and stats_tests")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000], help="sizes of the generated exports")
+    parser.add_argument("--questions", type=int, default=20, help="select_multiple questions in the export")
+    parser.add_argument("--options", type=int, default=10, help="options per question")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--only", nargs="+", help="run only the benchmarks whose name contains one of these")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slow down or memory growth flagged as a regression")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+    imports = check_import_budgets(args.repeat)
+    print("\n")
+    results = run_benchmarks(args.rows, args.questions, args.options, args.repeat, args.only, args.seed)
+    results["imports"] = imports
+    if args.baseline:
+        with open(args.baseline) as file:
+            comparison = compare(results, json.load(file), args.threshold)
+        results["comparison"] = comparison
+        results["meta"]["baseline"] = os.path.abspath(args.baseline)
+        print("\n\n")
+        for record in comparison:
+            flag = "REGRESSION" if record["regression"] else "ok"
+            print(f"{flag:<10} {record['name']:<42} rows={record['rows']:<10} time x{record['time_ratio']:.2f}  memory x{record['memory_ratio']:.2f}")
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"\nResults saved to {args.output}")
+    failed = any(record["regression"] for record in results.get("comparison", [])) or any(record["over_budget"] for record in imports)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
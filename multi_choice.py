@@ -0,0 +1,852 @@
+import numpy as np
+import pandas as pd 
+from typing import Callable, Iterator, List
+import hashlib
+import json
+import logging
+import os 
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+if __package__:
+    from . import profiling
+    from .profiling import profiled
+    from .stats_tests import pairwise_proportions_ztest
+    from .tete_utils import load_keyed_pickle, save_keyed_pickle
+else:
+    import profiling
+    from profiling import profiled
+    from stats_tests import pairwise_proportions_ztest
+    from tete_utils import load_keyed_pickle, save_keyed_pickle
+
+logger = logging.getLogger(__name__)
+
+
+@profiled
+def compact_dtypes(df:pd.DataFrame, max_category_ratio:float=0.5)-> pd.DataFrame:
+    """Converts the columns of an export to compact dtypes
+    0/1 "Question/option" columns (the select_multiple options) become uint8, missing values counting as 0
+    like they do in every table of this module. Other 0/1 columns only become uint8 when they have no missing
+    values, so skipped or empty answers stay missing for stats_tests. Text columns with few distinct values
+    become categoricals and the other integer columns are downcast to the smallest integer type that holds them.
+
+    Args:
+        df (pd.DataFrame): export as read by pandas
+        max_category_ratio (float, optional): text columns with at most this many distinct values per row become
+            categoricals. Defaults to 0.5.
+
+    Returns:
+        pd.DataFrame: converted copy of df
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype.kind in "biuf":
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            missing = np.isnan(values)
+            is_option = "/" in str(col)
+            if ((values == 0) | (values == 1) | missing).all() and (is_option or not missing.any()):
+                series = pd.Series(np.nan_to_num(values).astype(np.uint8), index=df.index, name=col)
+            elif series.dtype.kind in "iu":
+                series = pd.to_numeric(series, downcast="unsigned" if series.min() >= 0 else "integer")
+        elif series.dtype.kind in "OSU" or isinstance(series.dtype, pd.StringDtype):
+            if series.nunique(dropna=True) <= max_category_ratio * len(series):
+                series = series.astype("category")
+        columns[col] = series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _columnar_cache_path(file_location:str, sheet_name:str|None, compact:bool)->str:
+    # Hidden file next to the source eg "data/.survey.xlsx.Sheet1.compact.feather"
+    folder, name = os.path.split(os.path.abspath(file_location))
+    sheet = "" if sheet_name is None else "." + re.sub(r"[^\w.-]", "_", str(sheet_name))
+    return os.path.join(folder, f".{name}{sheet}.{'compact' if compact else 'raw'}.feather")
+
+
+def _read_columnar_cache(path:str, source_key:dict)->pd.DataFrame|None:
+    try:
+        from pyarrow import feather
+        table = feather.read_table(path, memory_map=True)
+    except (ImportError, OSError, ValueError):
+        return None
+    metadata = table.schema.metadata or {}
+    if json.loads(metadata.get(b"tete_source", b"{}")) != source_key:
+        return None  # The source changed since the cache was written
+    return table.to_pandas(split_blocks=True)
+
+
+def _write_columnar_cache(path:str, source_key:dict, df:pd.DataFrame)->None:
+    try:
+        import pyarrow as pa
+        from pyarrow import feather
+    except ImportError:
+        logger.warning("Caching the converted data needs pyarrow, loading without the cache")
+        return
+    try:
+        table = pa.Table.from_pandas(df.rename(columns=str))
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"tete_source": json.dumps(source_key).encode()})
+        # Uncompressed so the file can be memory mapped; written to a temporary file first so readers never see half a file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning("Could not write cache file %s: %s", path, e)
+
+
+@profiled
+def load_data(file_location:str|None, sheet_name:str|None=None, show_head:bool=True, compact:bool=False, cache:bool=False)-> pd.DataFrame:
+    """Reads a csv or xlsx export
+
+    Args:
+        file_location (str | None): csv or xlsx file to be read
+        sheet_name (str | None, optional): sheet to read for xlsx files. None reads every sheet into a dict of
+            dataframes, so it needs a sheet name with compact or cache.
+        show_head (bool, optional): print the first rows. Defaults to True.
+        compact (bool, optional): convert to compact dtypes, see compact_dtypes. Defaults to False.
+        cache (bool, optional): keep the (converted) data in a memory mappable columnar file next to the source
+            (needs pyarrow). The file is keyed by the source's modification time and size, so later runs open
+            it in milliseconds instead of parsing the export again until the export changes. Defaults to False.
+
+    Returns:
+        pd.DataFrame: the data
+    """
+    if file_location is None:
+        raise ValueError("Please provide a file location")
+    is_excel = file_location.split(".")[-1] in ["xlsx"]
+    if is_excel and sheet_name is None and (compact or cache):
+        raise ValueError("compact and cache work on one sheet, please provide the sheet_name of the xlsx file")
+    if cache:
+        stat = os.stat(file_location)
+        # compact_version changes whenever compact_dtypes converts differently, so older cache files are not reused
+        source_key = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sheet_name": sheet_name, "compact": compact, "compact_version": 2}
+        cache_path = _columnar_cache_path(file_location, sheet_name, compact)
+        df = _read_columnar_cache(cache_path, source_key)
+        if df is not None:
+            if show_head:
+                print(df.head(5))
+            return df
+    df = pd.read_excel(file_location, sheet_name=sheet_name) if is_excel else pd.read_csv(file_location) #type:ignore
+    if compact:
+        df = compact_dtypes(df) #type:ignore
+    if cache:
+        _write_columnar_cache(cache_path, source_key, df) #type:ignore
+    if show_head:
+        print(df.head(5)) #type:ignore
+    return df  #type:ignore
+
+
+def load_data_chunks(file_location:str|None, sheet_name:str|None=None, chunksize:int=100_000, usecols:Callable[[str], bool]|None=None)-> Iterator[pd.DataFrame]:
+    """Reads the data file in chunks of rows so that files larger than memory can be processed
+
+    Args:
+        file_location (str | None): csv or xlsx file to be read
+        sheet_name (str | None, optional): sheet to read for xlsx files. Defaults to the first sheet.
+        chunksize (int, optional): number of rows per chunk. Defaults to 100_000.
+        usecols (Callable[[str], bool] | None, optional): keeps only the columns for which it returns True
+
+    Yields:
+        Iterator[pd.DataFrame]: chunks of the data
+    """
+    if file_location is None:
+        raise ValueError("Please provide a file location")
+    if file_location.split(".")[-1] not in ["xlsx"]:
+        yield from pd.read_csv(file_location, chunksize=chunksize, usecols=usecols) #type:ignore
+        return
+
+    # openpyxl read-only mode streams the rows without loading the whole sheet
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_location, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name is not None else workbook.worksheets[0]
+        rows = worksheet.iter_rows(values_only=True)
+        header = [str(col) for col in next(rows, ())]
+        keep = [i for i, col in enumerate(header) if usecols is None or usecols(col)]
+        columns = [header[i] for i in keep]
+        buffer: list[list] = []
+        for row in rows:
+            buffer.append([row[i] if i < len(row) else None for i in keep])
+            if len(buffer) == chunksize:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+
+@profiled
+def filter_data(df:pd.DataFrame, interested_col:str)-> pd.DataFrame:
+    """Filters the dataframe and retuerns the columns that start with the interested column
+    Dont forget to add the forward slash at the end of the interested column eg "Has_Chronic_disease/"
+
+    Args:
+        df (pd.DataFrame): Dataframe to be filtered
+        interested_col (str): Column to be filtered
+
+    Returns:
+        pd.DataFrame: _description_
+    """
+    cols: List[str] = [i for i in df.columns if i.startswith(interested_col)]
+    return df[cols]
+
+
+def build_prefix_index(columns:List[str], prefixes:List[str])->dict[str, List[str]]:
+    """Groups the columns by the multi choice question prefix they start with in a single pass
+    over the columns, instead of one startswith scan per prefix as in filter_data
+
+    Args:
+        columns (List[str]): column names eg df.columns
+        prefixes (List[str]): multi choice question prefixes eg ["Has_Chronic_disease/", "Has_Disabililty/"]
+
+    Returns:
+        dict[str, List[str]]: prefix -> columns starting with it, in column order
+    """
+    index: dict[str, List[str]] = {prefix: [] for prefix in prefixes}
+    prefixes_by_length: dict[int, set[str]] = {}
+    for prefix in prefixes:
+        prefixes_by_length.setdefault(len(prefix), set()).add(prefix)
+    for col in columns:
+        for length, candidates in prefixes_by_length.items():
+            if col[:length] in candidates:
+                index[col[:length]].append(col)
+    return index
+
+    
+def _resolve_weights(df:pd.DataFrame, weights:str|pd.Series|np.ndarray|None)->tuple[pd.DataFrame, np.ndarray|None]:
+    # Weights can be a column of df (which is then left out of the analysis) or a separate array
+    if weights is None:
+        return df, None
+    if isinstance(weights, str):
+        return df.drop(columns=weights), np.nan_to_num(df[weights].to_numpy(dtype=np.float64, na_value=np.nan))
+    weights = np.nan_to_num(np.asarray(weights, dtype=np.float64))
+    if weights.shape != (df.shape[0],):
+        raise ValueError("weights must have one value per row of df")
+    return df, weights
+
+
+def _effective_n(weighted_sums:np.ndarray, squared_weight_sums:np.ndarray)->np.ndarray:
+    # Kish effective sample size (sum w)^2 / sum w^2, 0 for empty cells
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(squared_weight_sums > 0, weighted_sums ** 2 / squared_weight_sums, 0.0)
+
+    
+@profiled
+def mr_tab(df:pd.DataFrame, weights:str|pd.Series|np.ndarray|None=None)->pd.DataFrame:
+    """Generates a frequency table for the dataframe
+
+    Args:
+        df (pd.DataFrame): dataframe to be used
+        weights (str | pd.Series | np.ndarray | None, optional): survey weights, either the name of a column
+            of df or one value per row. Weighted tables get an extra "Effective N" column. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Frequency table
+    """
+    df, w = _resolve_weights(df, weights)
+    if w is None:
+        return _mr_tab_from_counts(df.sum(axis=0), df.shape[0]) #type:ignore
+    responses = np.nan_to_num(df.to_numpy(dtype=np.float64, na_value=np.nan))
+    frequencies = w @ responses
+    effective_n = _effective_n(frequencies, (w ** 2) @ responses)
+    return _mr_tab_from_counts(pd.Series(frequencies, index=df.columns), w.sum(), effective_n) #type:ignore
+
+
+def _column_totals(block:pd.DataFrame)->pd.Series:
+    # Sums in the columns' own dtype with an int64 accumulator, so compact uint8 exports are never widened to
+    # float64. Only float and nullable columns take the NaN aware path (missing counts as 0), and the totals
+    # are int64 whenever every column is an integer column, the same dtype as mr_tab
+    if all(isinstance(dtype, np.dtype) and dtype.kind in "biu" for dtype in block.dtypes):
+        return pd.Series(block.to_numpy().sum(axis=0, dtype=np.int64), index=block.columns)
+    totals = pd.Series(np.nansum(block.to_numpy(dtype=np.float64, na_value=np.nan), axis=0), index=block.columns)
+    if all(dtype.kind in "biu" for dtype in block.dtypes):
+        totals = totals.astype(np.int64)
+    return totals
+
+
+@profiled
+def mr_tab_all(df:pd.DataFrame, prefixes:List[str], weights:str|pd.Series|np.ndarray|None=None)->dict[str, pd.DataFrame]:
+    """Generates the mr_tab frequency table of every multi choice question at once.
+    The prefix index is built in one pass over the column names and each question's columns are
+    then summed as one block in their own dtype.
+
+    Args:
+        df (pd.DataFrame): dataframe with all the multi choice question columns
+        prefixes (List[str]): multi choice question prefixes eg ["Has_Chronic_disease/", "Has_Disabililty/"]
+        weights (str | pd.Series | np.ndarray | None, optional): survey weights, see mr_tab. Defaults to None.
+
+    Returns:
+        dict[str, pd.DataFrame]: prefix -> frequency table, same as mr_tab(filter_data(df, prefix))
+    """
+    df, w = _resolve_weights(df, weights)
+    tables: dict[str, pd.DataFrame] = {}
+    for prefix, cols in build_prefix_index(df.columns.to_list(), prefixes).items():
+        block = df[cols]
+        if w is None:
+            tables[prefix] = _mr_tab_from_counts(_column_totals(block), df.shape[0])
+            continue
+        responses = np.nan_to_num(block.to_numpy(dtype=np.float64, na_value=np.nan))
+        totals = w @ responses
+        tables[prefix] = _mr_tab_from_counts(pd.Series(totals, index=cols), w.sum(), _effective_n(totals, (w ** 2) @ responses))
+    return tables
+
+
+def _mr_tab_from_counts(frequencies:pd.Series, cases:float, effective_n:np.ndarray|None=None)->pd.DataFrame:
+    Total_Response = frequencies.sum()
+    return_df = frequencies.reset_index().rename(columns={"index":"Choice", 0:"Frequency"}) #type:ignore
+    return_df["Response Percentage"] =round((return_df["Frequency"]/Total_Response), 4) #type:ignore
+    return_df["Case Percentage"] = round((return_df["Frequency"]/cases), 4) #type:ignore
+    if effective_n is not None:
+        return_df["Effective N"] = np.round(effective_n, 2)
+    return return_df
+
+
+
+@profiled
+def get_mr_table_by(df:pd.DataFrame, index_col:str|list[str], value_columns:list[str]|str, weights:str|pd.Series|np.ndarray|None=None, significance:str|None=None, sig_level:float=0.05)->pd.DataFrame:
+    """Gets the multi repsonce table for the given columns and given catergorical columns
+
+    Args:
+        df (pd.DataFrame): dataframe to be used
+        index_col (str | list[str]):column to be used as index
+        value_columns (list[str | str]): multi choice question columns
+        weights (str | pd.Series | np.ndarray | None, optional): survey weights, either the name of a column
+            of df or one value per row. Only supported with a single index_col. Weighted tables get an
+            "Effective N <catergory>" column per catergory. Defaults to None.
+        significance (str | None, optional): multiple comparison correction ('bonferroni', 'holm', 'bh' or 'none')
+            for pairwise two-proportion z-tests between the catergories' column percentages. When given, each
+            catergory is labelled with a letter (A, B, ..., Z, AA, AB, ...) and a "<catergory> [<letter>]" column lists the
+            letters of the catergories it is significantly higher than (comma separated beyond 26 catergories). The catergory columns then show the column percentages
+            (option count / cases in the catergory) that the letters compare, instead of the row percentages.
+            Only supported with a single index_col. Defaults to None.
+        sig_level (float, optional): The significance level for the letters. Default is 0.05.
+
+    Returns:
+        pd.DataFrame: multi response table
+    """
+    if weights is not None or significance is not None:
+        if not isinstance(index_col, str):
+            raise ValueError("weights and significance are only supported with a single index_col")
+        value_columns = [value_columns] if isinstance(value_columns, str) else value_columns
+        df, w = _resolve_weights(df, weights)
+        percentages = "row" if significance is None else "column"  # The letters compare column percentages
+        return _banner_tables(df, [index_col], {"": value_columns}, percentages, w, significance, sig_level)[(index_col, "")]
+    df = pd.pivot_table(df, index=index_col, values=value_columns, aggfunc="sum").T #type:ignore
+    df["Total_Response"] = df.sum(axis=1) #type:ignore
+    for col in df.columns:
+        if col not in ["Total_Response",index_col]:
+            df[col] = df[col] / df["Total_Response"]
+    return df 
+
+
+@profiled
+def get_mr_tables_by_all(df:pd.DataFrame, index_cols:str|list[str], prefixes:List[str], percentages:str|None=None, weights:str|pd.Series|np.ndarray|None=None, significance:str|None=None, sig_level:float=0.05)->dict[tuple[str, str], pd.DataFrame]:
+    """Gets the get_mr_table_by table of every multi choice question for every catergorical column at once.
+    The rows are counted in chunks: each chunk of every catergorical column is one-hot encoded and multiplied
+    with the same chunk of all the question columns, so one pass gives the counts of every question.
+
+    Args:
+        df (pd.DataFrame): dataframe to be used
+        index_cols (str | list[str]): catergorical columns to slice by eg ["Gender", "Marital_status"]
+        prefixes (List[str]): multi choice question prefixes eg ["Has_Chronic_disease/", "Has_Disabililty/"]
+        percentages (str | None, optional): "row" divides each option by its Total_Response, as get_mr_table_by does.
+            "column" divides each option by the number of cases in the catergory instead. Defaults to None, which is
+            "column" with significance (the letters compare column percentages, so "row" is refused) and "row" otherwise.
+        weights (str | pd.Series | np.ndarray | None, optional): survey weights, see get_mr_table_by. Defaults to None.
+        significance (str | None, optional): correction for the significance letters, see get_mr_table_by. Defaults to None.
+        sig_level (float, optional): The significance level for the letters. Default is 0.05.
+
+    Returns:
+        dict[tuple[str, str], pd.DataFrame]: (catergorical column, prefix) -> multi response table
+    """
+    if percentages is None:
+        percentages = "row" if significance is None else "column"
+    if percentages not in ["row", "column"]:
+        raise ValueError("percentages must be 'row' or 'column'")
+    if significance is not None and percentages != "column":
+        raise ValueError("significance letters compare column percentages, use percentages='column'")
+    index_cols = [index_cols] if isinstance(index_cols, str) else index_cols
+    df, w = _resolve_weights(df, weights)
+    return _banner_tables(df, index_cols, build_prefix_index(df.columns.to_list(), prefixes), percentages, w, significance, sig_level)
+
+
+def _column_letter(i:int)->str:
+    # Spreadsheet style: A..Z, AA, AB, ..., AZ, BA, ...
+    letter = ""
+    i += 1
+    while i > 0:
+        i, remainder = divmod(i - 1, 26)
+        letter = chr(ord("A") + remainder) + letter
+    return letter
+
+
+def _significance_letters(counts:np.ndarray, bases:np.ndarray, correction:str, sig_level:float)->np.ndarray:
+    # counts is options x catergories; each cell gets the letters of the catergories it is significantly higher than
+    z, p_values = pairwise_proportions_ztest(counts, bases, correction)
+    higher = (p_values < sig_level) & (z > 0)
+    letters = np.array([_column_letter(i) for i in range(counts.shape[1])])
+    separator = "," if counts.shape[1] > 26 else ""  # "AB" would be ambiguous once two letter labels exist
+    return np.array([[separator.join(letters[row]) for row in option] for option in higher], dtype=object).reshape(counts.shape)
+
+
+_COUNT_CHUNK_BYTES = 32 * 1024 ** 2
+
+
+def _category_sums(block:pd.DataFrame, codes:List[np.ndarray], n_categories:List[int], w:np.ndarray|None=None, start:int=0)->List[tuple[np.ndarray, np.ndarray|None]]:
+    """Sums of the columns of block[start:] per catergory of each catergorical column
+
+    Works through chunks of rows, so only one chunk of the block is ever widened to float64 and the one-hot
+    matrices are chunk x catergories instead of n x catergories. Missing values count as 0 and missing
+    catergories (code -1) are left out, as in pivot_table. The float64 sums of integer columns are exact
+    (up to 2**53), so callers cast them back to int64.
+
+    Args:
+        block (pd.DataFrame): the question columns
+        codes (List[np.ndarray]): pd.factorize codes of each catergorical column, one per row of block
+        n_categories (List[int]): number of catergories of each catergorical column
+        w (np.ndarray | None, optional): survey weights, one per row of block. Defaults to None.
+        start (int, optional): first row to count. Defaults to 0.
+
+    Returns:
+        List[tuple[np.ndarray, np.ndarray | None]]: per catergorical column the catergories x columns sums and,
+            with weights, the same sums with squared weights (for the effective n)
+    """
+    n_rows, n_columns = block.shape
+    chunk_rows = max(1, _COUNT_CHUNK_BYTES // (8 * (n_columns + max(n_categories, default=0) + 1)))
+    sums = [np.zeros((k, n_columns)) for k in n_categories]
+    squared_sums = [None if w is None else np.zeros((k, n_columns)) for k in n_categories]
+    for chunk_start in range(start, n_rows, chunk_rows):
+        chunk = slice(chunk_start, min(chunk_start + chunk_rows, n_rows))
+        responses = np.nan_to_num(block.iloc[chunk].to_numpy(dtype=np.float64, na_value=np.nan))
+        for i, k in enumerate(n_categories):
+            chunk_codes = codes[i][chunk]
+            valid = chunk_codes >= 0
+            one_hot = np.zeros((responses.shape[0], k))
+            one_hot[np.flatnonzero(valid), chunk_codes[valid]] = 1.0 if w is None else w[chunk][valid]
+            sums[i] += one_hot.T @ responses
+            if w is not None:
+                squared_sums[i] += (one_hot * one_hot).T @ responses #type:ignore
+    return list(zip(sums, squared_sums))
+
+
+def _as_counts(sums:pd.DataFrame, dtypes:pd.Series, w:np.ndarray|None)->pd.DataFrame:
+    # Unweighted sums of integer columns come out of _category_sums exact, so they are given back as int64 counts
+    return sums.astype(np.int64) if w is None and all(dtype.kind in "biu" for dtype in dtypes) else sums
+
+
+def _banner_tables(df:pd.DataFrame, index_cols:List[str], question_columns:dict[str, List[str]], percentages:str, w:np.ndarray|None, significance:str|None=None, sig_level:float=0.05)->dict[tuple[str, str], pd.DataFrame]:
+    all_cols = list(dict.fromkeys(col for cols in question_columns.values() for col in cols))
+    position = {col: i for i, col in enumerate(all_cols)}
+    block = df[all_cols]
+    factorized = [pd.factorize(df[index_col], sort=True) for index_col in index_cols]
+    category_sums = _category_sums(block, [codes for codes, _ in factorized], [len(categories) for _, categories in factorized], w)
+
+    tables: dict[tuple[str, str], pd.DataFrame] = {}
+    for index_col, (codes, categories), (counts, squared_counts) in zip(index_cols, factorized, category_sums):
+        valid = codes >= 0
+        # counts is catergories x options
+        cases = np.bincount(codes[valid], weights=None if w is None else w[valid], minlength=len(categories)).astype(np.float64)
+        effective_n = None if w is None else _effective_n(counts, squared_counts) #type:ignore
+        bases = cases if w is None else _effective_n(cases, np.bincount(codes[valid], weights=w[valid] ** 2, minlength=len(categories)))
+        for prefix, cols in question_columns.items():
+            cols = sorted(cols)  # pivot_table sorts the value columns
+            positions = [position[col] for col in cols]
+            sums = _as_counts(pd.DataFrame(counts[:, positions], index=pd.Index(categories, name=index_col), columns=cols), block.dtypes[cols], w)
+            table = _mr_table_by_from_sums(sums, index_col)
+            if percentages == "column":
+                table[list(categories)] = sums.T.to_numpy() / cases
+            if effective_n is not None:
+                for i, category in enumerate(categories):
+                    table[f"Effective N {category}"] = np.round(effective_n[i, positions], 2)
+            if significance is not None:
+                # Proportions use the (weighted) cases, the z-test uses the (effective) base
+                letters = _significance_letters(counts[:, positions].T / cases * bases, bases, significance, sig_level)
+                for i, category in enumerate(categories):
+                    table[f"{category} [{_column_letter(i)}]"] = letters[:, i]
+            tables[(index_col, prefix)] = table
+    return tables
+
+
+def _mr_table_by_from_sums(sums:pd.DataFrame, index_col:str|list[str])->pd.DataFrame:
+    # Same layout as get_mr_table_by: pivot_table sorts the value columns
+    df = sums.sort_index(axis=1).T
+    total_response = df.sum(axis=1)
+    df = df.div(total_response, axis=0)  # One division for every catergory column at once
+    df["Total_Response"] = total_response
+    return df
+
+
+@profiled
+def mr_tab_chunked(file_location:str, interested_col:str, sheet_name:str|None=None, chunksize:int=100_000)->pd.DataFrame:
+    """Generates the same frequency table as mr_tab while reading the file in chunks,
+    so memory use is bounded by the chunk size rather than the file size
+
+    Args:
+        file_location (str): csv or xlsx file with the data
+        interested_col (str): start of the multi choice question columns eg "Has_Chronic_disease/"
+        sheet_name (str | None, optional): sheet to read for xlsx files
+        chunksize (int, optional): number of rows per chunk. Defaults to 100_000.
+
+    Returns:
+        pd.DataFrame: Frequency table
+    """
+    frequencies: pd.Series|None = None
+    cases = 0
+    for chunk in load_data_chunks(file_location, sheet_name, chunksize, usecols=lambda c: c.startswith(interested_col)):
+        chunk_sum = chunk.sum(axis=0)
+        frequencies = chunk_sum if frequencies is None else frequencies.add(chunk_sum, fill_value=0)
+        cases += chunk.shape[0]
+    if frequencies is None:
+        raise ValueError(f"No data found in {file_location}")
+    return _mr_tab_from_counts(frequencies, cases)
+
+
+@profiled
+def get_mr_table_by_chunked(file_location:str, index_col:str|list[str], interested_col:str, sheet_name:str|None=None, chunksize:int=100_000)->pd.DataFrame:
+    """Generates the same table as get_mr_table_by while reading the file in chunks
+
+    Args:
+        file_location (str): csv or xlsx file with the data
+        index_col (str | list[str]): column to be used as index
+        interested_col (str): start of the multi choice question columns eg "Has_Chronic_disease/"
+        sheet_name (str | None, optional): sheet to read for xlsx files
+        chunksize (int, optional): number of rows per chunk. Defaults to 100_000.
+
+    Returns:
+        pd.DataFrame: multi response table
+    """
+    index_cols = [index_col] if isinstance(index_col, str) else index_col
+    sums: pd.DataFrame|None = None
+    for chunk in load_data_chunks(file_location, sheet_name, chunksize, usecols=lambda c: c.startswith(interested_col) or c in index_cols):
+        value_columns = [c for c in chunk.columns if c not in index_cols]
+        chunk_sums = chunk.groupby(index_col)[value_columns].sum()
+        sums = chunk_sums if sums is None else sums.add(chunk_sums, fill_value=0)
+    if sums is None:
+        raise ValueError(f"No data found in {file_location}")
+    return _mr_table_by_from_sums(sums, index_col)
+
+
+@profiled
+def save_to_excel(df:pd.DataFrame, sheet_name:str, file_location:str="Multichoice_analysis_results.xlsx"):
+    """Saves the dataframe to an excel file
+    Reopens the whole file for every table, use ReportWriter to save many tables at once
+
+    Args:
+        df (pd.DataFrame): Dataframe to be saved
+        sheet_name (str): Name of the sheet to be saved
+        file_location (str, optional): excel file to save to. Defaults to "Multichoice_analysis_results.xlsx".
+    """
+    if os.path.exists(file_location):
+        with pd.ExcelWriter(file_location, mode="a", engine='openpyxl') as writer:
+            df.to_excel(writer, sheet_name= f"{sheet_name.split('/')[0]}", index=True) # type:ignore
+    else:
+        with pd.ExcelWriter(file_location, engine='openpyxl') as writer:
+            df.to_excel(writer, sheet_name= f"{sheet_name.split('/')[0]}", index=True) # type:ignore
+
+
+_WORKER_DATA: dict = {}
+
+
+def _init_report_worker(responses_path:str, banner_codes_path:str, columns:List[str], is_integer:List[bool], banners:List[str], banner_categories:List[list])->None:
+    # Runs once per worker process: the arrays are memory mapped, not pickled per task
+    _WORKER_DATA["responses"] = np.load(responses_path, mmap_mode="r")
+    _WORKER_DATA["banner_codes"] = np.load(banner_codes_path, mmap_mode="r")
+    _WORKER_DATA["position"] = {col: i for i, col in enumerate(columns)}
+    _WORKER_DATA["is_integer"] = dict(zip(columns, is_integer))
+    _WORKER_DATA["banners"] = banners
+    _WORKER_DATA["banner_categories"] = banner_categories
+
+
+def _report_worker(question_columns:dict[str, List[str]])->tuple[dict, dict]:
+    position, is_integer = _WORKER_DATA["position"], _WORKER_DATA["is_integer"]
+    cols = list(dict.fromkeys(col for question_cols in question_columns.values() for col in question_cols))
+    data: dict[str, pd.Series|np.ndarray|pd.Categorical] = {}
+    for col in cols:
+        values = np.asarray(_WORKER_DATA["responses"][:, position[col]])
+        # Missing values of nullable integer columns count as 0, as in mr_tab_all
+        data[col] = np.nan_to_num(values).astype(np.int64) if is_integer[col] else values.astype(np.float64)
+    for i, banner in enumerate(_WORKER_DATA["banners"]):
+        data[banner] = pd.Categorical.from_codes(np.asarray(_WORKER_DATA["banner_codes"][:, i]), categories=_WORKER_DATA["banner_categories"][i])
+    df = pd.DataFrame(data)
+    prefixes = list(question_columns)
+    return mr_tab_all(df, prefixes), get_mr_tables_by_all(df, _WORKER_DATA["banners"], prefixes)
+
+
+@profiled
+def run_report_parallel(df:pd.DataFrame, prefixes:List[str], banners:List[str]|None=None, max_workers:int|None=None)->tuple[dict[str, pd.DataFrame], dict[tuple[str, str], pd.DataFrame]]:
+    """Computes mr_tab_all and get_mr_tables_by_all with the questions spread over a process pool.
+    The question and banner columns are written once to memory mapped files that every worker reads,
+    so the survey data is not pickled for every task.
+
+    Args:
+        df (pd.DataFrame): dataframe to be used
+        prefixes (List[str]): multi choice question prefixes eg ["Has_Chronic_disease/", "Has_Disabililty/"]
+        banners (List[str] | None, optional): catergorical columns to slice by eg ["Gender", "Marital_status"]
+        max_workers (int | None, optional): number of worker processes. Defaults to the number of cores.
+
+    Returns:
+        tuple[dict, dict]: the mr_tab_all and get_mr_tables_by_all results, in the order of prefixes
+    """
+    banners = banners or []
+    max_workers = max_workers or os.cpu_count() or 1
+    question_columns = build_prefix_index(df.columns.to_list(), prefixes)
+    columns = list(dict.fromkeys(col for cols in question_columns.values() for col in cols))
+    dtypes = [df[col].dtype for col in columns]
+    is_integer = [dtype.kind in "biu" for dtype in dtypes]
+    # Kept in the columns' own dtype (uint8 for 0/1 exports), float64 only when a column can hold missing values
+    if all(isinstance(dtype, np.dtype) and dtype.kind in "biuf" for dtype in dtypes):
+        responses_dtype = np.result_type(*dtypes) if dtypes else np.dtype(np.float64)
+    else:
+        responses_dtype = np.dtype(np.float64)
+    banner_codes = np.empty((df.shape[0], len(banners)), dtype=np.int64)
+    banner_categories: List[list] = []
+    for i, banner in enumerate(banners):
+        codes, categories = pd.factorize(df[banner], sort=True)
+        banner_codes[:, i] = codes
+        banner_categories.append(list(categories))
+
+    # Contiguous chunks of questions keep the results in the order of prefixes
+    chunk_size = max(1, -(-len(prefixes) // max_workers))
+    chunks = [{prefix: question_columns[prefix] for prefix in prefixes[i:i + chunk_size]} for i in range(0, len(prefixes), chunk_size)]
+
+    frequency_tables: dict[str, pd.DataFrame] = {}
+    banner_tables: dict[tuple[str, str], pd.DataFrame] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        responses_path = os.path.join(tmp_dir, "responses.npy")
+        banner_codes_path = os.path.join(tmp_dir, "banner_codes.npy")
+        # Written one column at a time, so the parent never holds a second copy of the whole block
+        responses = np.lib.format.open_memmap(responses_path, mode="w+", dtype=responses_dtype, shape=(df.shape[0], len(columns)), fortran_order=True)
+        for i, col in enumerate(columns):
+            responses[:, i] = df[col].to_numpy(dtype=responses_dtype, na_value=np.nan) if responses_dtype.kind == "f" else df[col].to_numpy(dtype=responses_dtype)
+        responses.flush()
+        del responses
+        np.save(banner_codes_path, banner_codes)
+        del banner_codes
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_report_worker, initargs=(responses_path, banner_codes_path, columns, is_integer, banners, banner_categories)) as executor:
+            for chunk_frequency_tables, chunk_banner_tables in executor.map(_report_worker, chunks):
+                frequency_tables.update(chunk_frequency_tables)
+                banner_tables.update(chunk_banner_tables)
+    ordered_banner_tables = {(banner, prefix): banner_tables[(banner, prefix)] for prefix in prefixes for banner in banners}
+    return frequency_tables, ordered_banner_tables
+
+
+def _report_cache_path(cache_dir:str, prefix:str)->str:
+    return os.path.join(cache_dir, f"{hashlib.sha1(prefix.encode('utf-8')).hexdigest()}.report.pkl")
+
+
+@profiled
+def incremental_report(df:pd.DataFrame, prefixes:List[str], banners:List[str]|None=None, cache_dir:str=".report_cache")->tuple[dict[str, pd.DataFrame], dict[tuple[str, str], pd.DataFrame], dict[str, str]]:
+    """Computes mr_tab_all and get_mr_tables_by_all, reusing the results of earlier runs kept in cache_dir.
+    Every question is fingerprinted from the bytes of its option columns and a hash of the banner columns, so
+    a question is only recomputed when its inputs changed. When the data only gained rows at the end
+    (new submissions) the counts of the new rows are added to the cached counts, as frequencies are additive.
+
+    Args:
+        df (pd.DataFrame): dataframe to be used
+        prefixes (List[str]): multi choice question prefixes eg ["Has_Chronic_disease/", "Has_Disabililty/"]
+        banners (List[str] | None, optional): catergorical columns to slice by eg ["Gender", "Marital_status"]
+        cache_dir (str, optional): directory of the results cache, one file per question. Defaults to ".report_cache".
+
+    Returns:
+        tuple[dict, dict, dict]: the mr_tab_all and get_mr_tables_by_all results, in the order of prefixes,
+            and prefix -> "unchanged", "appended" or "recomputed"
+    """
+    banners = banners or []
+    question_columns = build_prefix_index(df.columns.to_list(), prefixes)
+    n_rows = df.shape[0]
+    # The banner values enter every question's fingerprint as one 64 bit hash per row
+    banner_hashes = pd.util.hash_pandas_object(df[banners], index=False).to_numpy() if banners else np.zeros(n_rows, dtype=np.uint64)
+    banner_digests: dict[int, str] = {}
+
+    def banner_digest(n:int)->str:
+        # Most questions were cached at the same row count, so the digest of the first n rows is shared
+        if n not in banner_digests:
+            banner_digests[n] = hashlib.blake2b(memoryview(np.ascontiguousarray(banner_hashes[:n])).cast("B"), digest_size=16).hexdigest()
+        return banner_digests[n]
+    banner_codes: dict[str, tuple[np.ndarray, pd.Index]] = {}
+
+    def factorized(banner:str)->tuple[np.ndarray, pd.Index]:
+        # Only factorized for the banners of the questions that changed
+        if banner not in banner_codes:
+            codes, categories = pd.factorize(df[banner], sort=True)
+            banner_codes[banner] = (codes, pd.Index(categories, name=banner))
+        return banner_codes[banner]
+
+    frequency_tables: dict[str, pd.DataFrame] = {}
+    banner_tables: dict[tuple[str, str], pd.DataFrame] = {}
+    status: dict[str, str] = {}
+    for prefix, cols in question_columns.items():
+        block = df[cols]
+        # Row major bytes in the columns' own dtype (1 byte per answer for compact exports), so the
+        # fingerprint of the first n rows is a prefix of the whole fingerprint
+        rows = block.to_numpy()
+        if rows.dtype == object:
+            rows = block.to_numpy(dtype=np.float64, na_value=np.nan)
+        rows = np.ascontiguousarray(rows)
+        path = _report_cache_path(cache_dir, prefix)
+        key = (prefix, tuple(cols), tuple(str(dtype) for dtype in block.dtypes), tuple(banners))
+        entry = load_keyed_pickle(path, key)  # None when the columns, dtypes or banners differ from the cached run
+
+        hasher = hashlib.blake2b(digest_size=16)
+        start = 0
+        if entry is not None and entry["n_rows"] <= n_rows:
+            hasher.update(memoryview(rows[:entry["n_rows"]]).cast("B"))
+            if (hasher.hexdigest(), banner_digest(entry["n_rows"])) == entry["digest"]:
+                start = entry["n_rows"]
+        if start == n_rows:
+            status[prefix] = "unchanged"
+            frequency_tables[prefix] = entry["frequency_table"] #type:ignore
+            banner_tables.update({(banner, prefix): entry["banner_tables"][banner] for banner in banners}) #type:ignore
+            continue
+        if start == 0:
+            hasher = hashlib.blake2b(digest_size=16)
+            hasher.update(memoryview(rows).cast("B"))
+            totals = np.zeros(len(cols), dtype=np.int64)
+            sums = {banner: pd.DataFrame(0.0, index=pd.Index([], name=banner), columns=cols) for banner in banners}
+            status[prefix] = "recomputed"
+        else:
+            hasher.update(memoryview(rows[start:]).cast("B"))
+            totals, sums = entry["totals"], entry["sums"] #type:ignore
+            status[prefix] = "appended"
+
+        # int64 totals for integer columns (same dtype as mr_tab_all), float64 otherwise
+        totals = totals + _column_totals(block.iloc[start:]).to_numpy()
+        frequency_tables[prefix] = _mr_tab_from_counts(pd.Series(totals, index=cols), n_rows)
+        codes = [factorized(banner) for banner in banners]
+        new_sums = _category_sums(block, [banner_codes for banner_codes, _ in codes], [len(categories) for _, categories in codes], start=start)
+        for banner, (_, categories), (counts, _) in zip(banners, codes, new_sums):
+            sums[banner] = sums[banner].add(pd.DataFrame(counts, index=categories, columns=cols), fill_value=0).sort_index().rename_axis(banner)
+            banner_tables[(banner, prefix)] = _mr_table_by_from_sums(_as_counts(sums[banner], block.dtypes, None), banner)
+        save_keyed_pickle(path, key, {
+            "n_rows": n_rows,
+            "digest": (hasher.hexdigest(), banner_digest(n_rows)),
+            "totals": totals,
+            "sums": sums,
+            "frequency_table": frequency_tables[prefix],
+            "banner_tables": {banner: banner_tables[(banner, prefix)] for banner in banners},
+        })
+    logger.info("Incremental report: %s", {kind: list(status.values()).count(kind) for kind in ["unchanged", "appended", "recomputed"]})
+    ordered_banner_tables = {(banner, prefix): banner_tables[(banner, prefix)] for prefix in prefixes for banner in banners}
+    return frequency_tables, ordered_banner_tables, status
+
+
+class ReportWriter:
+    """Collects the result tables and writes them all in one go
+
+    Formats:
+        "xlsx": one excel file, every table on its own sheet, written in a single ExcelWriter session
+        "csv": a directory with one csv file per table
+        "parquet": a directory with one parquet file per table (needs pyarrow or fastparquet)
+
+    Without output_format the format is taken from the extension of file_location (".xlsx", ".csv" or ".parquet");
+    a path without an extension is a csv directory and any other extension is refused.
+
+    Sheet names are cleaned of characters excel does not allow, cut to 31 characters and
+    made unique by adding a number at the end eg "Gender_Has_Chronic_disease_2"
+    """
+    def __init__(self, file_location:str="Multichoice_analysis_results.xlsx", output_format:str|None=None):
+        self.file_location = file_location
+        if output_format is None:
+            extension = os.path.splitext(file_location.rstrip("/\\"))[1].lower()
+            if extension not in ["", ".xlsx", ".csv", ".parquet"]:
+                raise ValueError(f"Cannot tell the output format from '{extension}', use .xlsx, .csv or .parquet or pass output_format")
+            output_format = extension[1:] or "csv"
+        self.output_format = output_format
+        if self.output_format not in ["xlsx", "csv", "parquet"]:
+            raise ValueError("output_format must be 'xlsx', 'csv' or 'parquet'")
+        self.tables: dict[str, pd.DataFrame] = {}
+
+    def _unique_name(self, sheet_name:str)->str:
+        name = re.sub(r"[\[\]:*?/\\]", "_", sheet_name.rstrip("/")).strip("'") or "Sheet"
+        name = name[:31]
+        candidate, number = name, 1
+        while candidate.lower() in (existing.lower() for existing in self.tables):
+            number += 1
+            suffix = f"_{number}"
+            candidate = f"{name[:31 - len(suffix)]}{suffix}"
+        return candidate
+
+    def add(self, df:pd.DataFrame, sheet_name:str)->str:
+        """Adds a table to the report and returns the sheet name it will be saved under"""
+        name = self._unique_name(sheet_name)
+        self.tables[name] = df
+        return name
+
+    @profiled
+    def write(self, only:set[str]|None=None)->None:
+        """Writes every table added so far
+
+        Args:
+            only (set[str] | None, optional): names (as returned by add) of the tables that changed. For csv and
+                parquet the other tables keep the files already on disk, excel files are always rewritten whole.
+                Defaults to None, writing every table.
+        """
+        if self.output_format == "xlsx":
+            with pd.ExcelWriter(self.file_location, engine='openpyxl') as writer:
+                for name, df in self.tables.items():
+                    df.to_excel(writer, sheet_name=name, index=True) # type:ignore
+            return
+        os.makedirs(self.file_location, exist_ok=True)
+        for name, df in self.tables.items():
+            path = os.path.join(self.file_location, f"{name}.{self.output_format}")
+            if only is not None and name not in only and os.path.exists(path):
+                continue
+            if self.output_format == "csv":
+                df.to_csv(path, index=True)
+            else:
+                # parquet needs string column names
+                df.rename(columns=str).to_parquet(path, index=True)
+        
+        
+def main(interested_catergory:str|list[str]|None=None, output_file:str="Multichoice_analysis_results.xlsx", output_format:str|None=None, workers:int=1,
+         data_file:str|None=None, sheet_name:str|None=None, multi_choice_columns:List[str]|None=None, cache_dir:str|None=None,
+         profile_file:str|None=None) -> None:
+    if not multi_choice_columns:
+        raise ValueError("Please provide the multi choice question prefixes eg ['Has_Chronic_disease/']")
+    if profile_file is None:
+        _run_report(interested_catergory, output_file, output_format, workers, data_file, sheet_name, multi_choice_columns, cache_dir)
+        return
+    # Times every stage and hot function of the run, see profiling.py
+    profiling.enable()
+    try:
+        with profiling.span("report.main"):
+            _run_report(interested_catergory, output_file, output_format, workers, data_file, sheet_name, multi_choice_columns, cache_dir)
+    finally:
+        profiling.disable()
+        report_file, trace_file = profiling.write_profile(profile_file)
+        logger.info("Profile saved to %s and %s", report_file, trace_file)
+
+
+def _run_report(interested_catergory:str|list[str]|None, output_file:str, output_format:str|None, workers:int,
+                data_file:str|None, sheet_name:str|None, multi_choice_columns:List[str], cache_dir:str|None) -> None:
+    with profiling.span("report.load"):
+        MAIN_DF = load_data(file_location=data_file, sheet_name=sheet_name if sheet_name is not None else 0) #type:ignore # First sheet by default
+    print("\n\n")
+    banners = [] if interested_catergory is None else [interested_catergory] if isinstance(interested_catergory, str) else interested_catergory
+    changed: List[str]|None = None
+    with profiling.span("report.tabulate"):
+        if cache_dir is not None:
+            # Only questions whose data changed since the last run are recomputed and rewritten
+            frequency_tables, banner_tables, status = incremental_report(MAIN_DF, multi_choice_columns, banners, cache_dir)
+            changed = [prefix for prefix, kind in status.items() if kind != "unchanged"]
+        elif workers > 1:
+            frequency_tables, banner_tables = run_report_parallel(MAIN_DF, multi_choice_columns, banners, max_workers=workers)
+        else:
+            frequency_tables = mr_tab_all(MAIN_DF, multi_choice_columns)
+            banner_tables = get_mr_tables_by_all(MAIN_DF, banners, multi_choice_columns)
+    report = ReportWriter(output_file, output_format)
+    changed_tables: set[str] = set()
+    for col in multi_choice_columns:
+        print(frequency_tables[col])
+        print("\n\n")
+        names = [report.add(frequency_tables[col], col)]
+        
+        for i in banners:
+            print(banner_tables[(i, col)])
+            print("\n\n")
+            names.append(report.add(banner_tables[(i, col)], f"{i}_{col}"))
+        if changed is None or col in changed:
+            changed_tables.update(names)
+    with profiling.span("report.write"):
+        report.write(only=None if changed is None else changed_tables)
@@ -0,0 +1,294 @@
+"""Lightweight instrumentation of the hot paths of tete_utils, the multi choice analyzer and stats_tests
+
+Functions decorated with @profiled (ExcelCache.get_sheet, load_data, filter_data, get_mr_table_by,
+save_to_excel, the stats_tests functions, ...) and `with span(name):` blocks record their wall time,
+peak memory growth (tracemalloc) and call count while profiling is enabled. When it is disabled a
+decorated call only costs one flag check. The profile of a run is written as a JSON report (totals
+per span, to diff between runs) and as a Chrome trace file (open it in chrome://tracing or https://ui.perfetto.dev).
+
+Examples:
+    import profiling
+    profiling.enable()
+    mr_tab_all(df, prefixes)
+    profiling.write_profile("profile.json")  # also writes profile.trace.json
+
+    python profiling.py baseline_profile.json profile.json --threshold 0.2
+
+Notes:
+    Memory is measured with tracemalloc, which slows down allocation heavy code; use enable(memory=False)
+    for timings only. The peak is process wide, so with several threads a span's peak includes the
+    allocations of the other threads. Work done in the processes of a process pool is not recorded.
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Iterator, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+
+class _Profile:
+    """The spans recorded since enable() was called"""
+    def __init__(self, memory:bool, max_events:int):
+        self.memory = memory
+        self.max_events = max_events
+        self.created = datetime.now(timezone.utc).isoformat()
+        self.origin_ns = time.perf_counter_ns()
+        self.end_ns: int|None = None
+        self.events: list[tuple[str, int, int, int, int]] = []  # name, start ns, duration ns, thread id, peak memory growth
+        self.totals: dict[str, list[int]] = {}  # name -> [calls, total ns, max ns, max peak memory growth]
+        self.dropped_events = 0
+        self.lock = threading.Lock()
+
+    def record(self, name:str, start_ns:int, duration_ns:int, memory_growth:int)->None:
+        with self.lock:
+            totals = self.totals.get(name)
+            if totals is None:
+                self.totals[name] = [1, duration_ns, duration_ns, memory_growth]
+            else:
+                totals[0] += 1
+                totals[1] += duration_ns
+                totals[2] = max(totals[2], duration_ns)
+                totals[3] = max(totals[3], memory_growth)
+            # The totals keep counting once the trace is full, so long runs have bounded memory
+            if len(self.events) < self.max_events:
+                self.events.append((name, start_ns - self.origin_ns, duration_ns, threading.get_ident(), memory_growth))
+            else:
+                self.dropped_events += 1
+
+
+_ENABLED = False
+_PROFILE: _Profile|None = None
+_STARTED_TRACEMALLOC = False
+_LOCAL = threading.local()  # Memory frames of the open spans, per thread
+
+
+def enable(memory:bool=True, max_events:int=1_000_000)->None:
+    """Starts a new profile, dropping the spans recorded so far
+
+    Args:
+        memory (bool, optional): record the peak memory growth of every span with tracemalloc. Defaults to True.
+        max_events (int, optional): spans kept for the Chrome trace, the totals count every span. Defaults to 1_000_000.
+    """
+    global _ENABLED, _PROFILE, _STARTED_TRACEMALLOC
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _STARTED_TRACEMALLOC = True
+    _PROFILE = _Profile(memory, max_events)
+    _ENABLED = True
+
+
+def disable()->None:
+    """Stops recording, the profile stays available to report() and the write functions"""
+    global _ENABLED, _STARTED_TRACEMALLOC
+    _ENABLED = False
+    if _PROFILE is not None and _PROFILE.end_ns is None:
+        _PROFILE.end_ns = time.perf_counter_ns()
+    if _STARTED_TRACEMALLOC:
+        tracemalloc.stop()
+        _STARTED_TRACEMALLOC = False
+
+
+def is_enabled()->bool:
+    return _ENABLED
+
+
+@contextmanager
+def span(name:str)->Iterator[None]:
+    """Records the time, peak memory growth and count of the code in the with block under name"""
+    profile = _PROFILE
+    if not _ENABLED or profile is None:
+        yield
+        return
+    stack: list[list[int]] = _LOCAL.__dict__.setdefault("stack", [])
+    memory = profile.memory and tracemalloc.is_tracing()
+    if memory:
+        # reset_peak() below loses the peak of the enclosing span, so it is carried in the enclosing frame
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        frame = [current, current]
+    else:
+        frame = [0, 0]
+    stack.append(frame)
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter_ns() - start
+        stack.pop()
+        growth = 0
+        if memory:
+            peak = max(tracemalloc.get_traced_memory()[1], frame[1])
+            growth = max(0, peak - frame[0])
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+        profile.record(name, start, duration, growth)
+
+
+def profiled(func:F|None=None, *, name:str|None=None):
+    """Decorator recording every call of func as a span named "<module>.<qualified name>" eg "multi_choice.load_data"
+
+    Args:
+        func (Callable | None, optional): the function, when used as @profiled
+        name (str | None, optional): span name, when used as @profiled(name="..."). Defaults to None.
+    """
+    def decorate(func:F)->F:
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper #type:ignore
+    return decorate if func is None else decorate(func)
+
+
+def report()->dict:
+    """Totals of the current profile
+
+    Returns:
+        dict: "meta" about the run and "spans", name -> calls, seconds, mean_seconds, max_seconds and peak_memory_bytes
+    """
+    if _PROFILE is None:
+        raise RuntimeError("Profiling was never enabled, call profiling.enable() first")
+    with _PROFILE.lock:
+        totals = {name: list(values) for name, values in _PROFILE.totals.items()}
+        dropped_events = _PROFILE.dropped_events
+    end_ns = _PROFILE.end_ns if _PROFILE.end_ns is not None else time.perf_counter_ns()
+    spans = {
+        name: {
+            "calls": calls,
+            "seconds": total_ns / 1e9,
+            "mean_seconds": total_ns / calls / 1e9,
+            "max_seconds": max_ns / 1e9,
+            "peak_memory_bytes": memory_growth,
+        }
+        for name, (calls, total_ns, max_ns, memory_growth) in sorted(totals.items())
+    }
+    meta = {
+        "created": _PROFILE.created,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pid": os.getpid(),
+        "wall_seconds": (end_ns - _PROFILE.origin_ns) / 1e9,
+        "memory": _PROFILE.memory,
+        "dropped_events": dropped_events,
+    }
+    return {"meta": meta, "spans": spans}
+
+
+def chrome_trace()->dict:
+    """The spans of the current profile in the Chrome trace event format, one complete ("X") event per span"""
+    if _PROFILE is None:
+        raise RuntimeError("Profiling was never enabled, call profiling.enable() first")
+    with _PROFILE.lock:
+        events = list(_PROFILE.events)
+    pid = os.getpid()
+    trace_events: list[dict] = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "tete_utils"}}]
+    for name, start_ns, duration_ns, thread_id, memory_growth in events:
+        trace_events.append({
+            "name": name, "cat": name.split(".", 1)[0], "ph": "X",
+            "ts": start_ns / 1e3, "dur": duration_ns / 1e3,  # Microseconds
+            "pid": pid, "tid": thread_id,
+            "args": {"peak_memory_bytes": memory_growth},
+        })
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms", "otherData": report()["meta"]}
+
+
+def write_profile(file_location:str="profile.json", trace_location:str|None=None)->tuple[str, str]:
+    """Writes the JSON report and the Chrome trace of the current profile
+
+    Args:
+        file_location (str, optional): JSON file for report(). Defaults to "profile.json".
+        trace_location (str | None, optional): JSON file for chrome_trace(). Defaults to file_location with ".trace.json" at the end.
+
+    Returns:
+        tuple[str, str]: the report and trace files
+    """
+    trace_location = trace_location or f"{os.path.splitext(file_location)[0]}.trace.json"
+    with open(file_location, "w") as file:
+        json.dump(report(), file, indent=2)
+    with open(trace_location, "w") as file:
+        json.dump(chrome_trace(), file)
+    return file_location, trace_location
+
+
+def compare_timings(now:dict, before:dict, threshold:float=0.2, min_seconds:float=0.001)->dict:
+    """Compares one measurement with its baseline, the rule shared by compare() and benchmarks.compare
+
+    Args:
+        now (dict): "seconds" and "peak_memory_bytes" of the new run
+        before (dict): "seconds" and "peak_memory_bytes" of the baseline run
+        threshold (float, optional): relative slow down (or memory growth) that counts as a regression. Defaults to 0.2.
+        min_seconds (float, optional): slow downs smaller than this are timer noise and never flagged. Defaults to 0.001.
+
+    Returns:
+        dict: both measurements, the time and memory ratios and the "regression" flag
+    """
+    time_ratio = now["seconds"] / before["seconds"] if before["seconds"] > 0 else 1.0
+    memory_ratio = now["peak_memory_bytes"] / before["peak_memory_bytes"] if before["peak_memory_bytes"] > 0 else 1.0
+    return {
+        "seconds": now["seconds"], "baseline_seconds": before["seconds"], "time_ratio": time_ratio,
+        "peak_memory_bytes": now["peak_memory_bytes"], "baseline_peak_memory_bytes": before["peak_memory_bytes"], "memory_ratio": memory_ratio,
+        "regression": (time_ratio > 1 + threshold and now["seconds"] - before["seconds"] > min_seconds) or memory_ratio > 1 + threshold,
+    }
+
+
+def compare(current:dict, baseline:dict, threshold:float=0.2, min_seconds:float=0.001)->list[dict]:
+    """Compares the spans of two reports, see compare_timings
+
+    Args:
+        current (dict): output of report()
+        baseline (dict): earlier output of report()
+        threshold (float, optional): relative slow down (or memory growth) that counts as a regression. Defaults to 0.2.
+        min_seconds (float, optional): slow downs smaller than this are timer noise and never flagged. Defaults to 0.001.
+
+    Returns:
+        list[dict]: one record per span, with the ratios and a "regression" flag (None for spans missing from a run)
+    """
+    comparison = []
+    for name in sorted(set(current["spans"]) | set(baseline["spans"])):
+        now, before = current["spans"].get(name), baseline["spans"].get(name)
+        if now is None or before is None:
+            comparison.append({"name": name, "calls": now and now["calls"], "baseline_calls": before and before["calls"], "regression": None})
+            continue
+        comparison.append({"name": name, "calls": now["calls"], "baseline_calls": before["calls"], **compare_timings(now, before, threshold, min_seconds)})
+    return comparison
+
+
+def main(argv:list[str]|None=None)->int:
+    parser = argparse.ArgumentParser(description="Compares two profile reports written by profiling.write_profile")
+    parser.add_argument("baseline", help="JSON report of the earlier run")
+    parser.add_argument("current", help="JSON report of the new run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slow down or memory growth flagged as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    comparison = compare(current, baseline, args.threshold)
+    for record in comparison:
+        if record["regression"] is None:
+            where = "baseline only" if record["calls"] is None else "new"
+            print(f"{where:<13} {record['name']}")
+            continue
+        flag = "REGRESSION" if record["regression"] else "ok"
+        print(f"{flag:<13} {record['name']:<48} calls {record['baseline_calls']}->{record['calls']}  "
+              f"{record['baseline_seconds']:.4f}s->{record['seconds']:.4f}s (x{record['time_ratio']:.2f})  memory x{record['memory_ratio']:.2f}")
+    return 1 if any(record["regression"] for record in comparison) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,58 @@
 # Library imports 
+import numpy as np
 import pandas as pd 
-import scipy.stats as stats
-from statsmodels.stats.contingency_tables import mcnemar
-from statsmodels.stats.multicomp import MultiComparison
+import importlib
 import itertools
-
-
-def decision(p_value:float, sig_level:float) -> str:
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, NamedTuple
+if __package__:
+    from .profiling import profiled
+else:
+    from profiling import profiled
+
+
+class _LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+    scipy and statsmodels take seconds to import, so they are only loaded once a test needs them."""
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+
+stats = _LazyModule("scipy.stats")
+special = _LazyModule("scipy.special")
+
+
+class TestResult(NamedTuple):
+    """Result of a statistical test. A list of results converts directly to a DataFrame with pd.DataFrame(results)."""
+    test: str
+    variable: str
+    statistic: float
+    p_value: float
+    n: int
+    decision: str
+
+
+class ResamplingResult(NamedTuple):
+    """Result of a permutation test with a bootstrap confidence interval of the effect size."""
+    test: str
+    variable: str
+    statistic: float
+    p_value: float
+    n: int
+    decision: str
+    effect: float
+    ci_low: float
+    ci_high: float
+    n_resamples: int
+
+
+def decision(p_value:float, sig_level:float, verbose:bool=True) -> str:
     """
     Make a decision based on the p-value and significance level.
     NB ..No df with nan values allowed
@@ -14,19 +60,28 @@ def decision(p_value:float, sig_level:float) -> str:
     Parameters:
     p_value (float): The p-value from the statistical test.
     sig_level (float): The significance level for the test.
+    verbose (bool, optional): Print the decision statement. Default is True.
 
     Returns:
-    str: Decision statement based on the comparison of p-value and significance level.
+    str: "Reject H0" or "Fail to reject H0" based on the comparison of p-value and significance level.
     """
     if p_value >= sig_level:
-        print(f"Fail to Reject the Null Hypothesis in favour of the alternative hypothesis because p-value:{p_value:.5f} is greater/equal to the significance level {sig_level}")
-    else:
+        if verbose:
+            print(f"Fail to Reject the Null Hypothesis in favour of the alternative hypothesis because p-value:{p_value:.5f} is greater/equal to the significance level {sig_level}")
+        return "Fail to reject H0"
+    if verbose:
         print(f"Accept the Alternative Hypothesis:because p-value:{p_value:.5f} is less than the significance level {sig_level}\n")
+    return "Reject H0"
+
+
+def _result(test:str, variable:str, statistic, p_value, n:int, sig_level:float, verbose:bool) -> TestResult:
+    return TestResult(test, variable, float(statistic), float(p_value), int(n), decision(p_value=float(p_value), sig_level=sig_level, verbose=verbose))
 
 
 ################## START OF TESTS FOR NORMALITY #####################################
 
-def Shapiro__Test(df:pd.DataFrame, df_column:str, Sig_level:float=0.05):
+@profiled
+def Shapiro__Test(df:pd.DataFrame, df_column:str, Sig_level:float=0.05, verbose:bool=True) -> TestResult:
     """
     used to test for normality in the dataset for data where n < 2_000
     Null hypothesis:the data is normally distributed. 
@@ -36,21 +91,26 @@ def Shapiro__Test(df:pd.DataFrame, df_column:str, Sig_level:float=0.05):
     df (pd.DataFrame): The DataFrame containing the data.
     df_column (str): The column name from DataFrame df to be tested.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level
+    TestResult: statistic, p-value, n and decision of the test.
 
+    NB.. only the first 2_000 rows are tested, use Shapiro__Test_large for a representative sample.
     """
     
-    shapiro_stat , P_value = stats.shapiro(df[df_column][:2_000]) # Subset for performance
-    print(f"Shapiro-Wilk Test: {df_column}")
-    print("======================================================================================================")
-    print(f"Shapiro-Wilk Test: {shapiro_stat}, p-value: {P_value}\n")
-    return decision(p_value=P_value, sig_level=Sig_level)
+    sample = df[df_column][:2_000] # Subset for performance
+    shapiro_stat , P_value = stats.shapiro(sample)
+    if verbose:
+        print(f"Shapiro-Wilk Test: {df_column}")
+        print("======================================================================================================")
+        print(f"Shapiro-Wilk Test: {shapiro_stat}, p-value: {P_value}\n")
+    return _result("Shapiro-Wilk", df_column, shapiro_stat, P_value, len(sample), Sig_level, verbose)
 
 
 
-def Kolmogorov_Smirnov_Test(df:pd.DataFrame, df_column:str,type:str="norm", Sig_level:float=0.05):
+@profiled
+def Kolmogorov_Smirnov_Test(df:pd.DataFrame, df_column:str,type:str="norm", Sig_level:float=0.05, verbose:bool=True) -> TestResult:
     """
     used to test for normality in the dataset for data where n >= 2_000
     Null hypothesis:the data is normally distributed. 
@@ -60,22 +120,277 @@ def Kolmogorov_Smirnov_Test(df:pd.DataFrame, df_column:str,type:str="norm", Sig_
     df_column (str): The column name from DataFrame df to be tested.
     type(str): The type of distribution your testing against
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level
+    TestResult: statistic, p-value, n and decision of the test.
 
     """
     ks_stat , P_value = stats.kstest(df[df_column], type)
-    print(f"Kolmogorov-Smirnov Test: {df_column}")
-    print("======================================================================================================")
-    print(f"Kolmogorov-Smirnov Test: {ks_stat}, p-value: {P_value}\n")
-    return decision(p_value=P_value, sig_level=Sig_level)
+    if verbose:
+        print(f"Kolmogorov-Smirnov Test: {df_column}")
+        print("======================================================================================================")
+        print(f"Kolmogorov-Smirnov Test: {ks_stat}, p-value: {P_value}\n")
+    return _result("Kolmogorov-Smirnov", df_column, ks_stat, P_value, len(df[df_column]), Sig_level, verbose)
 
 ################## END OF TESTS FOR NORMALITY #####################################
 
 
+################## START OF LARGE-N TESTS FOR NORMALITY (chunked / out-of-core data) #####################################
+
+def _iter_chunks(data: pd.DataFrame | Iterable[pd.DataFrame]) -> Iterable[pd.DataFrame]:
+    # Accepts a DataFrame or any iterable of DataFrame chunks eg pd.read_csv(..., chunksize=100_000)
+    if isinstance(data, pd.DataFrame):
+        yield data
+    else:
+        yield from data
+
+
+@profiled
+def reservoir_sample(data: pd.DataFrame | Iterable[pd.DataFrame], df_column: str, size: int = 2_000, stratify: str | None = None, seed=None) -> np.ndarray:
+    """
+    Draw a uniform random sample of a column in one pass over the data at constant memory (reservoir sampling).
+    With stratify, one reservoir is kept per stratum and the final sample is drawn proportionally to the stratum sizes.
+
+    Parameters:
+    data (pd.DataFrame | Iterable[pd.DataFrame]): The DataFrame or chunks of it.
+    df_column (str): The column to sample, missing values are skipped.
+    size (int, optional): The sample size. Default is 2_000.
+    stratify (str, optional): Column to stratify by, eg the enumerator or the submission date. Default is None.
+    seed (int, optional): Seed for a reproducible sample. Default is None.
+
+    Returns:
+    np.ndarray: The sampled values.
+    """
+    rng = np.random.default_rng(seed)
+    reservoirs: dict = {}
+    seen: dict = {}
+    for chunk in _iter_chunks(data):
+        chunk = chunk[chunk[df_column].notna()]
+        strata = [(None, chunk)] if stratify is None else chunk.groupby(stratify, sort=False)
+        for stratum, part in strata:
+            values = part[df_column].to_numpy(dtype=np.float64)
+            reservoir = reservoirs.setdefault(stratum, np.empty(0))
+            count = seen.get(stratum, 0)
+            # Fill the reservoir first, then item t replaces a random slot with probability size / t
+            fill = min(size - reservoir.size, values.size)
+            reservoir = np.concatenate([reservoir, values[:fill]])
+            rest = values[fill:]
+            if rest.size:
+                positions = rng.integers(0, count + fill + 1 + np.arange(rest.size))
+                keep = positions < size
+                reservoir[positions[keep]] = rest[keep]
+            reservoirs[stratum] = reservoir
+            seen[stratum] = count + values.size
+    if stratify is None:
+        return reservoirs.get(None, np.empty(0))
+
+    total = sum(seen.values())
+    samples = []
+    for stratum, reservoir in reservoirs.items():
+        share = min(reservoir.size, int(round(size * seen[stratum] / total)))
+        samples.append(rng.choice(reservoir, share, replace=False))
+    return np.concatenate(samples) if samples else np.empty(0)
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch (a compactor hierarchy as in the KLL sketch).
+    Each level holds at most `k` sorted items; a full level keeps every other item (random offset)
+    and promotes them to the next level with double weight. Memory is O(k log(n / k)).
+    The rank error is about 1 / k, so with `k_per_sqrt_n` the level size grows to k_per_sqrt_n * sqrt(n)
+    and the error stays a fixed fraction of the 1 / sqrt(n) resolution of the goodness of fit tests.
+    Sketches built on separate chunks or workers can be combined with merge.
+    """
+    def __init__(self, k: int = 4_096, seed=None, k_per_sqrt_n: float = 0.0):
+        self.k = k
+        self.k_per_sqrt_n = k_per_sqrt_n
+        self.count = 0
+        self.levels: list[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _compress(self) -> None:
+        capacity = max(self.k, int(self.k_per_sqrt_n * np.sqrt(self.count)))
+        h = 0
+        while h < len(self.levels):
+            if self.levels[h].size > capacity:
+                level = np.sort(self.levels[h])
+                promoted = level[self._rng.integers(0, 2)::2]
+                if level.size % 2:  # An odd item out stays on this level
+                    self.levels[h], promoted = level[-1:], promoted[:level.size // 2]
+                else:
+                    self.levels[h] = np.empty(0)
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def update(self, values) -> "QuantileSketch":
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += values.size
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def weighted_items(self) -> tuple[np.ndarray, np.ndarray]:
+        """Sorted items and their weights."""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level.size, 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def cdf(self, x) -> np.ndarray:
+        items, weights = self.weighted_items()
+        cumulative = np.concatenate([[0.0], np.cumsum(weights)])
+        return cumulative[np.searchsorted(items, x, side="right")] / cumulative[-1]
+
+    def quantile(self, q) -> np.ndarray:
+        items, weights = self.weighted_items()
+        cumulative = np.cumsum(weights) / weights.sum()
+        return items[np.minimum(np.searchsorted(cumulative, q, side="left"), items.size - 1)]
+
+
+_SKETCH_K_PER_SQRT_N = 32.0  # Rank error about 1 / (32 sqrt(n))
+
+
+def _sketch_column(data: pd.DataFrame | Iterable[pd.DataFrame], df_column: str, k: int | None, seed) -> tuple[QuantileSketch, float, float]:
+    # By default the sketch grows with n: a fixed k rejects normal data once 1 / sqrt(n) is below the rank error
+    sketch = QuantileSketch(k=k, seed=seed) if k is not None else QuantileSketch(seed=seed, k_per_sqrt_n=_SKETCH_K_PER_SQRT_N)
+    total = total_sq = 0.0
+    for chunk in _iter_chunks(data):
+        values = chunk[df_column].to_numpy(dtype=np.float64)
+        values = values[np.isfinite(values)]
+        sketch.update(values)
+        total += values.sum()
+        total_sq += (values * values).sum()
+    mean = total / sketch.count
+    std = np.sqrt((total_sq - sketch.count * mean ** 2) / (sketch.count - 1))
+    return sketch, mean, std
+
+
+@profiled
+def Shapiro__Test_large(data: pd.DataFrame | Iterable[pd.DataFrame], df_column: str, sample_size: int = 2_000, stratify: str | None = None, seed=None, Sig_level: float = 0.05, verbose: bool = True) -> TestResult:
+    """
+    Shapiro__Test on a representative one-pass reservoir (or stratified) sample instead of the first rows.
+    Works on chunked or out-of-core data at constant memory.
+    Null hypothesis:the data is normally distributed. 
+
+    Parameters:
+    data (pd.DataFrame | Iterable[pd.DataFrame]): The DataFrame or chunks of it.
+    df_column (str): The column to be tested.
+    sample_size (int, optional): The sample size. Default is 2_000.
+    stratify (str, optional): Column to stratify the sample by. Default is None.
+    seed (int, optional): Seed for a reproducible sample. Default is None.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
+
+    Returns:
+    TestResult: statistic, p-value, n (sample size) and decision of the test.
+    """
+    sample = reservoir_sample(data, df_column, sample_size, stratify, seed)
+    shapiro_stat , P_value = stats.shapiro(sample)
+    if verbose:
+        print(f"Shapiro-Wilk Test (reservoir sample of {sample.size}): {df_column}")
+        print("======================================================================================================")
+        print(f"Shapiro-Wilk Test: {shapiro_stat}, p-value: {P_value}\n")
+    return _result("Shapiro-Wilk", df_column, shapiro_stat, P_value, sample.size, Sig_level, verbose)
+
+
+@profiled
+def Kolmogorov_Smirnov_Test_sketch(data: pd.DataFrame | Iterable[pd.DataFrame], df_column: str, type: str = "norm", args: tuple = (), k: int | None = None, seed=None, Sig_level: float = 0.05, verbose: bool = True) -> TestResult:
+    """
+    Kolmogorov_Smirnov_Test computed from a streaming quantile sketch, so the column never has to be in memory.
+    The statistic is accurate to about the rank error of the sketch, around 1 / (32 sqrt(n)) with the default k.
+    Null hypothesis:the data is normally distributed. 
+
+    Parameters:
+    data (pd.DataFrame | Iterable[pd.DataFrame]): The DataFrame or chunks of it.
+    df_column (str): The column to be tested.
+    type(str): The type of distribution your testing against (a scipy.stats distribution name).
+    args (tuple, optional): Parameters of the distribution, as in stats.kstest. Default is () (eg the standard normal).
+    k (int, optional): Fixed items per level of the sketch, larger is more accurate. Default is None, growing
+        with the number of rows (32 * sqrt(n), at least 4_096) so the sketch error does not decide the test.
+    seed (int, optional): Seed of the sketch compaction. Default is None.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
+
+    Returns:
+    TestResult: statistic, p-value, n and decision of the test.
+    """
+    sketch, _, _ = _sketch_column(data, df_column, k, seed)
+    items, weights = sketch.weighted_items()
+    cumulative = np.cumsum(weights) / weights.sum()
+    cdf = getattr(stats, type).cdf(items, *args)
+    ks_stat = max(np.max(cumulative - cdf), np.max(cdf - (cumulative - weights / weights.sum())))
+    P_value = stats.kstwo.sf(ks_stat, sketch.count)
+    if verbose:
+        print(f"Kolmogorov-Smirnov Test (sketch): {df_column}")
+        print("======================================================================================================")
+        print(f"Kolmogorov-Smirnov Test: {ks_stat}, p-value: {P_value}\n")
+    return _result("Kolmogorov-Smirnov", df_column, ks_stat, P_value, sketch.count, Sig_level, verbose)
+
+
+@profiled
+def Anderson_Darling_Test_sketch(data: pd.DataFrame | Iterable[pd.DataFrame], df_column: str, k: int | None = None, grid_size: int = 10_000, seed=None, Sig_level: float = 0.05, verbose: bool = True) -> TestResult:
+    """
+    Anderson-Darling test for normality (mean and standard deviation estimated from the data) computed from a
+    streaming quantile sketch and streaming moments. The A2 integral is evaluated numerically on a grid of the
+    fitted normal distribution and the p-value uses D'Agostino's approximation.
+    Null hypothesis:the data is normally distributed. 
+
+    Parameters:
+    data (pd.DataFrame | Iterable[pd.DataFrame]): The DataFrame or chunks of it.
+    df_column (str): The column to be tested.
+    k (int, optional): Fixed items per level of the sketch, larger is more accurate. Default is None, growing
+        with the number of rows (32 * sqrt(n), at least 4_096) so the sketch error does not decide the test.
+    grid_size (int, optional): Points used for the numerical integral. Default is 10_000.
+    seed (int, optional): Seed of the sketch compaction. Default is None.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
+
+    Returns:
+    TestResult: statistic (A2), p-value, n and decision of the test.
+    """
+    sketch, mean, std = _sketch_column(data, df_column, k, seed)
+    n = sketch.count
+    u = (np.arange(grid_size) + 0.5) / grid_size
+    empirical = sketch.cdf(stats.norm.ppf(u, loc=mean, scale=std))
+    a2 = n * np.mean((empirical - u) ** 2 / (u * (1 - u)))
+    a2_star = a2 * (1 + 0.75 / n + 2.25 / n ** 2)
+    if a2_star >= 10:
+        # Far outside the range of the approximation, whose exponent turns upwards again near 153
+        P_value = 0.0
+    elif a2_star >= 0.6:
+        P_value = np.exp(1.2937 - 5.709 * a2_star + 0.0186 * a2_star ** 2)
+    elif a2_star >= 0.34:
+        P_value = np.exp(0.9177 - 4.279 * a2_star - 1.38 * a2_star ** 2)
+    elif a2_star >= 0.2:
+        P_value = 1 - np.exp(-8.318 + 42.796 * a2_star - 59.938 * a2_star ** 2)
+    else:
+        P_value = 1 - np.exp(-13.436 + 101.14 * a2_star - 223.73 * a2_star ** 2)
+    P_value = float(np.clip(P_value, 0.0, 1.0))
+    if verbose:
+        print(f"Anderson-Darling Test (sketch): {df_column}")
+        print("======================================================================================================")
+        print(f"Anderson-Darling Test: {a2}, p-value: {P_value}\n")
+    return _result("Anderson-Darling", df_column, a2, P_value, n, Sig_level, verbose)
+
+################## END OF LARGE-N TESTS FOR NORMALITY #####################################
+
+
 ################## START OF ONE GROUP STATISTICAL TESTS #####################################
-def Cat_chisquare_1sam(df:pd.DataFrame, df_column:str, expected_obs, Sig_level:float=0.05):
+@profiled
+def Cat_chisquare_1sam(df:pd.DataFrame, df_column:str, expected_obs, Sig_level:float=0.05, verbose:bool=True) -> TestResult:
     """
     Perform a chi-squared goodness-of-fit test on a categorical column.
     Used when you have a one sample categorical/Nominal variable eg YES or NO and an expected observations.
@@ -87,18 +402,21 @@ def Cat_chisquare_1sam(df:pd.DataFrame, df_column:str, expected_obs, Sig_level:f
     df_column (str): The column name from DataFrame df to be tested.
     expected_obs (list): The expected frequencies for the categories.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level.
+    TestResult: statistic, p-value, n and decision of the test.
     """
     
     chi2_stat , P_value = stats.chisquare(f_obs=df[df_column], f_exp=expected_obs)
-    print(f"Chi-squared test for {df_column}:")
-    print("======================================================================================================")
-    print(f"Chi2 Stat: {chi2_stat}, p-value: {P_value}\n")
-    return decision(p_value=P_value, sig_level=Sig_level)
+    if verbose:
+        print(f"Chi-squared test for {df_column}:")
+        print("======================================================================================================")
+        print(f"Chi2 Stat: {chi2_stat}, p-value: {P_value}\n")
+    return _result("Chi-squared goodness-of-fit", df_column, chi2_stat, P_value, df[df_column].sum(), Sig_level, verbose)
     
-def Ordinal_Wilicoxon_1sam(df:pd.DataFrame, df_column:str, alternative_side:str="two_sided", Sig_level:float=0.05):
+@profiled
+def Ordinal_Wilicoxon_1sam(df:pd.DataFrame, df_column:str, alternative_side:str="two-sided", Sig_level:float=0.05, verbose:bool=True) -> TestResult:
     """
     Perform a Wilcoxon signed-rank test on an ordinal column.
     used on unknown distribution or non normally distributed ordinal/interval/ratio data only.
@@ -110,17 +428,20 @@ def Ordinal_Wilicoxon_1sam(df:pd.DataFrame, df_column:str, alternative_side:str=
     df_column (str): The column name from DataFrame df to be tested.
     alternative_side (str, optional): The alternative hypothesis ('two-sided', 'greater', or 'less'). Default is 'two-sided'.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level.
+    TestResult: statistic, p-value, n and decision of the test.
     """
     w_stat , P_value = stats.wilcoxon(df[df_column], alternative=alternative_side)
-    print(f"Wilcoxon signed-rank test for  {df_column}:")
-    print("======================================================================================================")
-    print(f"W Stat: {w_stat}, p-value: {P_value}\n")
-    return decision(p_value=P_value, sig_level=Sig_level)
-
-def Ttest_1sam(df:pd.DataFrame, df_column:str, POP_mean, alternative_side:str='two-sided', Sig_level:float=0.05):
+    if verbose:
+        print(f"Wilcoxon signed-rank test for  {df_column}:")
+        print("======================================================================================================")
+        print(f"W Stat: {w_stat}, p-value: {P_value}\n")
+    return _result("Wilcoxon signed-rank", df_column, w_stat, P_value, len(df[df_column]), Sig_level, verbose)
+
+@profiled
+def Ttest_1sam(df:pd.DataFrame, df_column:str, POP_mean, alternative_side:str='two-sided', Sig_level:float=0.05, verbose:bool=True) -> TestResult:
     """
     Perform a one-sample t-test on a numerical column.
     used on normally distributed interval/ratio data only
@@ -133,23 +454,26 @@ def Ttest_1sam(df:pd.DataFrame, df_column:str, POP_mean, alternative_side:str='t
     POP_mean (float): The population mean to compare against.
     alternative_side (str, optional): The alternative hypothesis ('two-sided', 'greater', or 'less'). Default is 'two-sided'.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level.
+    TestResult: statistic, p-value, n and decision of the test.
     """
     
     t_stat , P_value = stats.ttest_1samp(df[df_column], popmean=POP_mean, alternative=alternative_side)
-    print(f"One-sample t-test for {df_column}:")
-    print("======================================================================================================")
-    print(f"T Stat: {t_stat}, p-value: {P_value}\n")
-    return decision(p_value=P_value, sig_level=Sig_level)
+    if verbose:
+        print(f"One-sample t-test for {df_column}:")
+        print("======================================================================================================")
+        print(f"T Stat: {t_stat}, p-value: {P_value}\n")
+    return _result("One-sample t-test", df_column, t_stat, P_value, len(df[df_column]), Sig_level, verbose)
     
 ################## END OF ONE GROUP STATISTICAL TESTS #####################################
 
 
 ################## START OF TWO GROUP STATISTICAL TESTS ####################################################################
 #####  start of two groups (independant samples) ########
-def Man_whiteny_2sam_diff(df:pd.DataFrame, group1:str, group2:str, alternative_side:str='two-sided', Sig_level:float=0.05):
+@profiled
+def Man_whiteny_2sam_diff(df:pd.DataFrame, group1:str, group2:str, alternative_side:str='two-sided', Sig_level:float=0.05, verbose:bool=True) -> TestResult:
     """
     Perform the Mann-Whitney U test on two independent samples.
     used on unknown distribution or non normally distributed ordinal/interval/ratio data only.
@@ -162,17 +486,20 @@ def Man_whiteny_2sam_diff(df:pd.DataFrame, group1:str, group2:str, alternative_s
     group2_column (str): The column name for the second group.
     alternative_side (str, optional): The alternative hypothesis ('two-sided', 'greater', or 'less'). Default is 'two-sided'.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level.
+    TestResult: statistic, p-value, n and decision of the test.
     """
     u_stat, P_value = stats.mannwhitneyu(df[group1], df[group2], alternative=alternative_side)
-    print(f"Mann-Whitney U test for {group1} & {group2}:")
-    print("======================================================================================================")
-    print(f"U Stat: {u_stat}, p-value: {P_value}\n")
-    return decision(p_value=P_value, sig_level=Sig_level)
-
-def Ttest_2sam(df:pd.DataFrame, group1:str, group2:str, alternative_side:str='two-sided', Sig_level:float=0.05):
+    if verbose:
+        print(f"Mann-Whitney U test for {group1} & {group2}:")
+        print("======================================================================================================")
+        print(f"U Stat: {u_stat}, p-value: {P_value}\n")
+    return _result("Mann-Whitney U", f"{group1} & {group2}", u_stat, P_value, len(df[group1]) + len(df[group2]), Sig_level, verbose)
+
+@profiled
+def Ttest_2sam(df:pd.DataFrame, group1:str, group2:str, alternative_side:str='two-sided', Sig_level:float=0.05, verbose:bool=True) -> TestResult:
     """
     Perform a two-sample t-test on two independent samples.
     used on normally distributed  interval/ratio data only.
@@ -185,42 +512,217 @@ def Ttest_2sam(df:pd.DataFrame, group1:str, group2:str, alternative_side:str='tw
     group2_column (str): The column name for the second group.
     alternative_side (str, optional): The alternative hypothesis ('two-sided', 'greater', or 'less'). Default is 'two-sided'.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level.
+    TestResult: statistic, p-value, n and decision of the test.
     """
 
     t_stat , P_value = stats.ttest_ind(df[group1], df[group2], alternative=alternative_side)
-    print(f"Two-sample t-testfor {group1} & {group2}:")
-    print("======================================================================================================")
-    print(f"T Stat: {t_stat}, p-value: {P_value}\n")
-    return decision(p_value=P_value, sig_level=Sig_level)
-
-#fisher needs further implementation
-def Fisher_2sam(df:pd.DataFrame, group_column1:str, group_column2:str, Sig_level:float=0.05):
+    if verbose:
+        print(f"Two-sample t-testfor {group1} & {group2}:")
+        print("======================================================================================================")
+        print(f"T Stat: {t_stat}, p-value: {P_value}\n")
+    return _result("Two-sample t-test", f"{group1} & {group2}", t_stat, P_value, len(df[group1]) + len(df[group2]), Sig_level, verbose)
+
+def _fisher_column_bounds(rows: tuple, column: int, log_factorial: list[float]) -> tuple[float, float]:
+    # Largest and smallest log weight -sum(log n_i!) of one column of the table given what is left of the row margins.
+    # The largest spreads the column as evenly as the rows allow, the smallest piles it into the biggest rows
+    even, left = 0.0, column
+    for i, cap in enumerate(rows):  # rows are sorted ascending
+        cell = min(cap, left // (len(rows) - i))
+        even -= log_factorial[cell]
+        left -= cell
+    piled, left = 0.0, column
+    for cap in reversed(rows):
+        cell = min(cap, left)
+        piled -= log_factorial[cell]
+        left -= cell
+    return even, piled
+
+
+def _count_compositions(rows: tuple, column: int) -> int:
+    # How many ways there are to split one column total over the rows, without listing them
+    ways = np.zeros(column + 1)
+    ways[0] = 1
+    for cap in rows:
+        cumulative = np.cumsum(ways)
+        shifted = np.concatenate([np.zeros(cap + 1), cumulative])[:column + 1]
+        ways = cumulative - shifted
+    return ways[column]
+
+
+def _fisher_compositions(rows: tuple, column: int) -> np.ndarray:
+    # Every way to split one column total over the rows (one way per row of the result), built a row at a time
+    cells = np.zeros((1, 0), dtype=np.int64)
+    left = np.array([column])
+    for i, cap in enumerate(rows):
+        low = np.maximum(0, left - sum(rows[i + 1:]))
+        high = np.minimum(cap, left)
+        sizes = np.maximum(high - low + 1, 0)
+        parent = np.repeat(np.arange(left.size), sizes)
+        cell = low[parent] + np.arange(parent.size) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        cells = np.column_stack([cells[parent], cell])
+        left = left[parent] - cell
+    return cells
+
+
+_FISHER_STAGE_PATHS_PER_PATH = 4  # Paths one column may generate before merging, per allowed stored path
+
+
+def _fisher_exact_rxc(table: np.ndarray, max_paths: int | None = None) -> float | None:
+    """
+    Exact p-value of Fisher's test for an R x C table with the network algorithm (Mehta & Patel):
+    the tables are built a column at a time, the nodes are the (sorted) row margins still to fill and
+    paths that reach a node with the same probability are merged. A node whose every completion is
+    at least as extreme as the observed table is counted in closed form and one whose completions
+    are all less extreme is dropped, so only the undecided part of the network is expanded.
+    Returns None when the network keeps more than max_paths paths after merging, or when one column
+    would generate more than _FISHER_STAGE_PATHS_PER_PATH * max_paths paths before they are merged (memory).
+    """
+    if table.shape[0] > table.shape[1]:
+        table = table.T  # Fewer rows means fewer ways to split each column
+    rows = tuple(sorted(int(r) for r in table.sum(axis=1)))
+    columns = sorted(int(c) for c in table.sum(axis=0))
+    n = sum(columns)
+    log_factorial_array = special.gammaln(np.arange(n + 1) + 1)
+    log_factorial = log_factorial_array.tolist()  # log_factorial[k] = log k!
+    observed = -sum(log_factorial[int(cell)] for cell in table.ravel()) + 1e-7  # Relative tolerance for tables as likely as the observed one
+    log_total = log_factorial[n] - sum(log_factorial[r] for r in rows) - sum(log_factorial[c] for c in columns)
+
+    p_value = 0.0
+    stored = 0
+    # Each node keeps the log weights of the paths reaching it and how many paths share each weight
+    stage = [(rows, np.zeros(1), np.ones(1))]
+    for j in range(len(columns) + 1):
+        arrivals = []
+        generated = 0
+        remaining_columns = columns[j:]
+        columns_term = log_factorial[sum(remaining_columns)] - sum(log_factorial[c] for c in remaining_columns)
+        for node, past, count in stage:
+            completions = columns_term - sum(log_factorial[r] for r in node)
+            most_likely = least_likely = 0.0
+            for column in remaining_columns:
+                even, piled = _fisher_column_bounds(node, column, log_factorial)
+                most_likely += even
+                least_likely += piled
+            extreme = past + most_likely <= observed
+            p_value += float((count[extreme] * np.exp(past[extreme] + completions - log_total)).sum())
+            undecided = ~extreme & (past + least_likely <= observed)
+            if not undecided.any():
+                continue
+            past, count = past[undecided], count[undecided]
+            generated += past.size * _count_compositions(node, columns[j])
+            if max_paths is not None and generated > _FISHER_STAGE_PATHS_PER_PATH * max_paths:
+                return None
+            cells = _fisher_compositions(node, columns[j])
+            remaining = np.sort(np.array(node) - cells, axis=1)
+            weight = -log_factorial_array[cells].sum(axis=1)
+            arrivals.append((np.repeat(remaining, past.size, axis=0), (weight[:, None] + past[None, :]).ravel(), np.tile(count, len(cells))))
+        if not arrivals:
+            break
+        # Merge the paths reaching the same node with the same weight, then split them up by node
+        nodes = np.concatenate([arrival[0] for arrival in arrivals])
+        weights = np.round(np.concatenate([arrival[1] for arrival in arrivals]), 9)
+        counts = np.concatenate([arrival[2] for arrival in arrivals])
+        order = np.lexsort((weights, *nodes.T[::-1]))
+        nodes, weights, counts = nodes[order], weights[order], counts[order]
+        new_node = np.r_[True, (nodes[1:] != nodes[:-1]).any(axis=1)]
+        new_path = new_node | np.r_[True, weights[1:] != weights[:-1]]
+        path_starts = np.flatnonzero(new_path)
+        counts = np.add.reduceat(counts, path_starts)
+        weights, nodes, new_node = weights[path_starts], nodes[path_starts], new_node[path_starts]
+        stored += weights.size
+        if max_paths is not None and stored > max_paths:
+            return None
+        node_starts = np.flatnonzero(new_node)
+        stage = [(tuple(nodes[start].tolist()), past, count)
+                 for start, past, count in zip(node_starts, np.split(weights, node_starts[1:]), np.split(counts, node_starts[1:]))]
+    return min(1.0, p_value)
+
+
+def _fisher_random_tables(rng: np.random.Generator, rows: np.ndarray, columns: np.ndarray, size: int) -> np.ndarray:
+    # Random tables with fixed margins (hypergeometric under H0), filled a cell at a time for the whole batch,
+    # so the cost depends on the table shape and not on the sample size
+    R, C = rows.size, columns.size
+    tables = np.empty((size, R, C), dtype=np.int64)
+    remaining = np.tile(rows, (size, 1))
+    for j in range(C - 1):
+        need = np.full(size, columns[j], dtype=np.int64)
+        for i in range(R - 1):
+            others = remaining[:, i + 1:].sum(axis=1)
+            cell = rng.hypergeometric(remaining[:, i], others, need)
+            tables[:, i, j] = cell
+            remaining[:, i] -= cell
+            need -= cell
+        tables[:, R - 1, j] = need
+        remaining[:, R - 1] -= need
+    tables[:, :, C - 1] = remaining
+    return tables
+
+
+@profiled
+def Fisher_2sam(df:pd.DataFrame, group_column1:str, group_column2:str, Sig_level:float=0.05, verbose:bool=True,
+                method:str="auto", n_simulations:int=10_000, seed=None, max_paths:int=1_000_000, workers:int=1) -> TestResult:
     """
-    Perform Fisher's exact test on a 2x2 contingency table.
-    used on unknown distribution or non normally distributed categorical data only.
+    Perform Fisher's exact test on the contingency table of two categorical columns (2x2 or R x C).
+    used on unknown distribution or non normally distributed categorical data only, eg sparse tables where chi-square is not valid.
     Null hypothesis : No difference
 
     Parameters:
-    df (list): A 2x2 contingency table.
+    df (pd.DataFrame): The DataFrame containing the data.
+    group_column1 (str): The column name of the rows in the contingency table.
+    group_column2 (str): The column name of the columns in the contingency table.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
+    method (str, optional): 'exact', 'monte-carlo' or 'auto' (exact unless the table is too big, see max_paths). Default is 'auto'.
+    n_simulations (int, optional): Number of simulated tables with the same margins for the Monte Carlo p-value. Default is 10_000.
+    seed (int, optional): Seed for a reproducible Monte Carlo p-value. Default is None.
+    max_paths (int, optional): With method='auto', the exact algorithm gives up for Monte Carlo once the network keeps this many paths after merging equal nodes (about a second or two of work). Default is 1_000_000.
+    workers (int, optional): Number of worker processes for the simulation. Default is 1.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level.
+    TestResult: statistic (odds ratio for a 2x2 table, else the probability of the observed table), p-value, n and decision of the test.
     
     """
+    if method not in ("auto", "exact", "monte-carlo"):
+        raise ValueError("method must be 'auto', 'exact' or 'monte-carlo'")
     table = pd.crosstab(df[group_column1], df[group_column2])
-    oddsratio , P_value = stats.fisher_exact(table)
-    print(f"Fisher's exact test {table.columns}:")
-    print("======================================================================================================")
-    print(f"Odds Ratio: {oddsratio}, p-value: {P_value}\n")
-    return decision(p_value=P_value, sig_level=Sig_level)
+    counts = table.to_numpy().astype(np.int64)
+    variable = f"{group_column1} & {group_column2}"
+    if counts.shape == (2, 2) and method != "monte-carlo":
+        oddsratio , P_value = stats.fisher_exact(counts)
+        if verbose:
+            print(f"Fisher's exact test {table.columns}:")
+            print("======================================================================================================")
+            print(f"Odds Ratio: {oddsratio}, p-value: {P_value}\n")
+        return _result("Fisher's exact", variable, oddsratio, P_value, counts.sum(), Sig_level, verbose)
+
+    rows, columns = counts.sum(axis=1), counts.sum(axis=0)
+    log_weight = -special.gammaln(counts + 1).sum()
+    table_probability = float(np.exp(log_weight - special.gammaln(counts.sum() + 1) + special.gammaln(rows + 1).sum() + special.gammaln(columns + 1).sum()))
+    test = "Fisher's exact"
+    P_value = None
+    if min(counts.shape) < 2:
+        P_value = 1.0
+    elif method != "monte-carlo":
+        P_value = _fisher_exact_rxc(counts, None if method == "exact" else max_paths)
+    if P_value is None:
+        test = "Fisher's exact (Monte Carlo)"
+        data = {"kind": "fisher", "rows": rows, "columns": columns, "table": counts.ravel()}
+        seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        simulated = _run_resampling(data, "permutation", n_simulations, seed_sequence, workers, 64 * 1024 ** 2)
+        P_value = ((simulated <= log_weight + 1e-7).sum() + 1) / (n_simulations + 1)
+    if verbose:
+        print(f"{test} test {table.shape[0]}x{table.shape[1]} {variable}:")
+        print("======================================================================================================")
+        print(f"Table probability: {table_probability}, p-value: {P_value}\n")
+    return _result(test, variable, table_probability, P_value, counts.sum(), Sig_level, verbose)
 #####  end of two groups (independant samples) ########
 
 #####  start of  dependant two group samples (same people) ########
-def Wilcoxon_Ranksum_2sam_dep(df: pd.DataFrame, before_column: str, after_column: str, alternative_side:str='two-sided', Sig_level: float = 0.05) -> str:
+@profiled
+def Wilcoxon_Ranksum_2sam_dep(df: pd.DataFrame, before_column: str, after_column: str, alternative_side:str='two-sided', Sig_level: float = 0.05, verbose:bool=True) -> TestResult:
     """
     Perform a Wilcoxon signed-rank test on two dependent samples.
     Used when the data has an unknown distribution or non normal distribution use case on (ordinal and interval/ratio data)
@@ -232,17 +734,20 @@ def Wilcoxon_Ranksum_2sam_dep(df: pd.DataFrame, before_column: str, after_column
     before_column (str): The column name for the before measurements.
     after_column (str): The column name for the after measurements.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level.
+    TestResult: statistic, p-value, n and decision of the test.
     """
     w_stat, P_value = stats.wilcoxon(df[before_column], df[after_column], alternative=alternative_side)
-    print(f"Wilcoxon signed-rank test for {before_column} and {after_column}:")
-    print("======================================================================================================")
-    print(f"W Stat: {w_stat}, p-value: {P_value}\n")
-    return decision(p_value=P_value, sig_level=Sig_level)
+    if verbose:
+        print(f"Wilcoxon signed-rank test for {before_column} and {after_column}:")
+        print("======================================================================================================")
+        print(f"W Stat: {w_stat}, p-value: {P_value}\n")
+    return _result("Wilcoxon signed-rank (paired)", f"{before_column} & {after_column}", w_stat, P_value, len(df), Sig_level, verbose)
     
-def Paired_ttest_2sam(df:pd.DataFrame, before_column:str, after_column:str, alternative_side:str='two-sided', Sig_level:float = 0.05) -> str:
+@profiled
+def Paired_ttest_2sam(df:pd.DataFrame, before_column:str, after_column:str, alternative_side:str='two-sided', Sig_level:float = 0.05, verbose:bool=True) -> TestResult:
     """
         Perform a paired t-test on two dependent samples.
         Used when the data is normally distributed data use case on(ratio/interval data)
@@ -254,17 +759,20 @@ def Paired_ttest_2sam(df:pd.DataFrame, before_column:str, after_column:str, alte
         before_column (str): The column name for the before measurements.
         after_column (str): The column name for the after measurements.
         Sig_level (float, optional): The significance level for the test. Default is 0.05.
+        verbose (bool, optional): Print the test output. Default is True.
 
         Returns:
-        str: Result of the decision function based on the p-value and significance level.
+        TestResult: statistic, p-value, n and decision of the test.
         """
     t_stat, P_value = stats.ttest_rel(df[before_column], df[after_column], alternative=alternative_side)
-    print(f"Paired t-test for {before_column} and {after_column}:")
-    print("======================================================================================================")
-    print(f"T Stat: {t_stat}, p-value: {P_value}\n")
-    return decision(p_value=P_value, sig_level=Sig_level)
+    if verbose:
+        print(f"Paired t-test for {before_column} and {after_column}:")
+        print("======================================================================================================")
+        print(f"T Stat: {t_stat}, p-value: {P_value}\n")
+    return _result("Paired t-test", f"{before_column} & {after_column}", t_stat, P_value, len(df), Sig_level, verbose)
     
-def Mcnemar_test_2sam(df: pd.DataFrame, group1_column: str, group2_column: str,  Sig_level: float = 0.05) -> str:
+@profiled
+def Mcnemar_test_2sam(df: pd.DataFrame, group1_column: str, group2_column: str,  Sig_level: float = 0.05, verbose:bool=True) -> TestResult:
 
     """
     Perform McNemar's test on paired nominal data.
@@ -276,16 +784,19 @@ def Mcnemar_test_2sam(df: pd.DataFrame, group1_column: str, group2_column: str,
     group1_column (str): The column name for the first group.
     group2_column (str): The column name for the second group.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level.
+    TestResult: statistic, p-value, n and decision of the test.
     """
     table = pd.crosstab(df[group1_column], df[group2_column])
+    from statsmodels.stats.contingency_tables import mcnemar
     result = mcnemar(table, exact=True)
-    print(f"McNemar's test for {group1_column} and {group2_column}:")
-    print("======================================================================================================")
-    print(f"Statistic: {result.statistic}, p-value: {result.pvalue}\n")
-    return decision(p_value=result.pvalue, sig_level=Sig_level)
+    if verbose:
+        print(f"McNemar's test for {group1_column} and {group2_column}:")
+        print("======================================================================================================")
+        print(f"Statistic: {result.statistic}, p-value: {result.pvalue}\n")
+    return _result("McNemar", f"{group1_column} & {group2_column}", result.statistic, result.pvalue, table.to_numpy().sum(), Sig_level, verbose)
 ################## end of dependant two group samples (same people)  #####################################
 
 ################## END OF TWO GROUP STATISTICAL TESTS #####################################
@@ -293,7 +804,8 @@ def Mcnemar_test_2sam(df: pd.DataFrame, group1_column: str, group2_column: str,
 ##########  START OF THREE GROUP OR MORE  STATISTICAL TESTS #################################
 ################## Start of tests for independent groups #####################################
 
-def kruskal_wallis_test(df: pd.DataFrame, column: str, group_column: str, Sig_level: float = 0.05) -> str:
+@profiled
+def kruskal_wallis_test(df: pd.DataFrame, column: str, group_column: str, Sig_level: float = 0.05, verbose:bool=True) -> TestResult:
     """
     Perform the Kruskal-Wallis H test on three or more independent groups.
     used when data is not normally distributed and is ordinal or interval/ratio
@@ -304,19 +816,22 @@ def kruskal_wallis_test(df: pd.DataFrame, column: str, group_column: str, Sig_le
     column (str): The column name of the variable.
     group_column (str): The column name of the groups.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level.
+    TestResult: statistic, p-value, n and decision of the test.
     """
     groups = [group[column].values for name, group in df.groupby(group_column)]
     stat, p_value = stats.kruskal(*groups)
-    print(f"Kruskal-Wallis H test for {column} by {group_column}:")
-    print("======================================================================================================")
-    print(f"H Stat: {stat}, p-value: {p_value}\n")
-    return decision(p_value=p_value, sig_level=Sig_level)
+    if verbose:
+        print(f"Kruskal-Wallis H test for {column} by {group_column}:")
+        print("======================================================================================================")
+        print(f"H Stat: {stat}, p-value: {p_value}\n")
+    return _result("Kruskal-Wallis H", f"{column} by {group_column}", stat, p_value, sum(len(group) for group in groups), Sig_level, verbose)
 
 
-def anova_test(df: pd.DataFrame, column:str ,group_column: list[str], Sig_level: float = 0.05) -> str:
+@profiled
+def anova_test(df: pd.DataFrame, column:str ,group_column: str, Sig_level: float = 0.05, verbose:bool=True) -> TestResult:
     """
     Perform a one-way ANOVA on three or more independent groups.
     used when data is normally distributed
@@ -325,21 +840,24 @@ def anova_test(df: pd.DataFrame, column:str ,group_column: list[str], Sig_level:
     Parameters:
     df (pd.DataFrame): The DataFrame containing the data.
     column(Str): variable to test 
-    group_columnslist(str): The column name of the groups.
+    group_column(str): The column name of the groups.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level.
+    TestResult: statistic, p-value, n and decision of the test.
     """
     groups = [group[column].values for name, group in df.groupby(group_column)]
     stat, p_value = stats.f_oneway(*groups)
-    print(f"One-way ANOVA for groups {column}:")
-    print("======================================================================================================")
-    print(f"F Stat: {stat}, p-value: {p_value}\n")
-    return decision(p_value=p_value, sig_level=Sig_level)
+    if verbose:
+        print(f"One-way ANOVA for groups {column}:")
+        print("======================================================================================================")
+        print(f"F Stat: {stat}, p-value: {p_value}\n")
+    return _result("One-way ANOVA", f"{column} by {group_column}", stat, p_value, sum(len(group) for group in groups), Sig_level, verbose)
 
 
-def chi2_independence_test(df: pd.DataFrame, row_column: str, col_column: str, Sig_level: float = 0.05) -> str:
+@profiled
+def chi2_independence_test(df: pd.DataFrame, row_column: str, col_column: str, Sig_level: float = 0.05, verbose:bool=True) -> TestResult:
     """
     Perform a chi-square test of independence on three or more  categorical variables.
     used when data is not normally distributed and is categorical
@@ -350,22 +868,25 @@ def chi2_independence_test(df: pd.DataFrame, row_column: str, col_column: str, S
     row_column (str): The column name of the rows in the contingency table.
     col_column (str): The column name of the columns in the contingency table.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
 
     Returns:
-    str: Result of the decision function based on the p-value and significance level.
+    TestResult: statistic, p-value, n and decision of the test.
     """
     table = pd.crosstab(df[row_column], df[col_column])
     chi2_stat, p_value, dof, expected = stats.chi2_contingency(table)
-    print(f"Chi-square test of independence for {row_column} and {col_column}:")
-    print("======================================================================================================")
-    print(f"Chi2 Stat: {chi2_stat}, p-value: {p_value}\n")
-    return decision(p_value=p_value, sig_level=Sig_level)
+    if verbose:
+        print(f"Chi-square test of independence for {row_column} and {col_column}:")
+        print("======================================================================================================")
+        print(f"Chi2 Stat: {chi2_stat}, p-value: {p_value}\n")
+    return _result("Chi-square independence", f"{row_column} & {col_column}", chi2_stat, p_value, table.to_numpy().sum(), Sig_level, verbose)
 
 ##########  END OF THREE GROUP OR MORE  STATISTICAL TESTS #################################
 
 ################## Start of post hoc tests for independent groups #####################################
 
-def pairwise_mannwhitneyu(df: pd.DataFrame, column: str, group_column: str, Sig_level: float = 0.05) -> None:
+@profiled
+def pairwise_mannwhitneyu(df: pd.DataFrame, column: str, group_column: str, Sig_level: float = 0.05, verbose: bool = True) -> pd.DataFrame:
     """
     Perform pairwise Mann-Whitney U tests for post hoc analysis after the Kruskal-Wallis H test.
     Null hypothesis : No difference
@@ -375,15 +896,26 @@ def pairwise_mannwhitneyu(df: pd.DataFrame, column: str, group_column: str, Sig_
     column (str): The column name of the variable.
     group_column (str): The column name of the groups.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
+
+    Returns:
+    pd.DataFrame: One row per pair of groups with the U statistic, p-value and Bonferroni significance.
+
+    NB.. for many groups use posthoc_pairwise, which sorts each group once for all the pairs.
     """
     groups = {name: group[column].values for name, group in df.groupby(group_column)}
     comparisons = list(itertools.combinations(groups.keys(), 2))
+    results = []
     for (group1, group2) in comparisons:
         stat, p_value = stats.mannwhitneyu(groups[group1], groups[group2])
-        print(f"Mann-Whitney U test between {group1} and {group2}: U Stat: {stat}, p-value: {p_value}, Significant: {p_value < Sig_level/len(comparisons)}")
+        results.append({"group1": group1, "group2": group2, "statistic": stat, "p_value": p_value, "significant": p_value < Sig_level/len(comparisons)})
+        if verbose:
+            print(f"Mann-Whitney U test between {group1} and {group2}: U Stat: {stat}, p-value: {p_value}, Significant: {p_value < Sig_level/len(comparisons)}")
+    return pd.DataFrame(results, columns=["group1", "group2", "statistic", "p_value", "significant"])
 
 
-def tukey_hsd_posthoc(df: pd.DataFrame, column: str, group_column: str) -> None:
+@profiled
+def tukey_hsd_posthoc(df: pd.DataFrame, column: str, group_column: str, verbose: bool = True):
     """
     Perform Tukey HSD post hoc analysis after one-way ANOVA.
     
@@ -393,15 +925,44 @@ def tukey_hsd_posthoc(df: pd.DataFrame, column: str, group_column: str) -> None:
     df (pd.DataFrame): The DataFrame containing the data.
     column (str): The column name of the variable.
     group_column (str): The column name of the groups.
+    verbose (bool, optional): Print the test output. Default is True.
+
+    Returns:
+    TukeyHSDResults: The statsmodels Tukey HSD results.
     """
+    from statsmodels.stats.multicomp import MultiComparison
     comp = MultiComparison(df[column], df[group_column])
     post_hoc_res = comp.tukeyhsd()
-    print(post_hoc_res)
-
-
-def pairwise_chi2_test(df: pd.DataFrame, row_column: str, col_column: str, Sig_level: float = 0.05) -> None:
+    if verbose:
+        print(post_hoc_res)
+    return post_hoc_res
+
+
+def _pairwise_chi2_arrays(table: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Every R x 2 sub-table of column pairs at once: pairs are broadcast along the last axis
+    table = np.asarray(table, dtype=np.float64)
+    i, j = np.triu_indices(table.shape[1], k=1)
+    observed = np.stack([table[:, i], table[:, j]])  # 2 x R x pairs
+    row_totals = observed.sum(axis=0)
+    col_totals = observed.sum(axis=1, keepdims=True)
+    total = col_totals.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        expected = row_totals * col_totals / total
+        # Rows that are empty for both columns of a pair carry no information and are left out
+        dof = (row_totals > 0).sum(axis=0) - 1
+        deviation = np.abs(observed - expected)
+        # Yates' correction on 2x2 tables, as stats.chi2_contingency does
+        deviation = np.where(dof == 1, deviation - np.minimum(0.5, deviation), deviation)
+        chi2_stat = np.where(expected > 0, deviation ** 2 / expected, 0.0).sum(axis=(0, 1))
+    p_values = np.where(dof > 0, stats.chi2.sf(chi2_stat, np.maximum(dof, 1)), 1.0)
+    return chi2_stat, p_values, dof
+
+
+@profiled
+def pairwise_chi2_test(df: pd.DataFrame, row_column: str, col_column: str, Sig_level: float = 0.05, verbose: bool = True, correction: str = "bonferroni") -> pd.DataFrame:
     """
     Perform pairwise chi-square tests for post hoc analysis after the chi-square test of independence.
+    Every pair of columns of the contingency table is tested at once.
     Null hypothesis : No difference
 
     Parameters:
@@ -409,13 +970,733 @@ def pairwise_chi2_test(df: pd.DataFrame, row_column: str, col_column: str, Sig_l
     row_column (str): The column name of the rows in the contingency table.
     col_column (str): The column name of the columns in the contingency table.
     Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    verbose (bool, optional): Print the test output. Default is True.
+    correction (str, optional): 'bonferroni', 'holm', 'bh' or 'none', see adjust_pvalues. Default is 'bonferroni'.
+
+    Returns:
+    pd.DataFrame: One row per pair of columns with the chi2 statistic, p-value and corrected significance.
     """
     table = pd.crosstab(df[row_column], df[col_column])
     groups = table.columns
+    chi2_stat, p_values, dof = _pairwise_chi2_arrays(table.to_numpy())
+    significant = adjust_pvalues(p_values, correction) < Sig_level
     comparisons = list(itertools.combinations(groups, 2))
-    for (group1, group2) in comparisons:
-        sub_table = table.loc[:, [group1, group2]]
-        chi2_stat, p_value, dof, expected = stats.chi2_contingency(sub_table)
-        print(f"Chi-square test between {group1} and {group2}: Chi2 Stat: {chi2_stat}, p-value: {p_value}, Significant: {p_value < Sig_level/len(comparisons)}")
+    results = pd.DataFrame({
+        "group1": [group1 for group1, _ in comparisons],
+        "group2": [group2 for _, group2 in comparisons],
+        "statistic": chi2_stat,
+        "p_value": p_values,
+        "significant": significant,
+    }, columns=["group1", "group2", "statistic", "p_value", "significant"])
+    if verbose:
+        for row in results.itertuples(index=False):
+            print(f"Chi-square test between {row.group1} and {row.group2}: Chi2 Stat: {row.statistic}, p-value: {row.p_value}, Significant: {row.significant}")
+    return results
+
+
+@profiled
+def pairwise_chi2_matrix(df: pd.DataFrame, row_column: str, col_column: str, Sig_level: float = 0.05, correction: str = "holm") -> dict[str, pd.DataFrame]:
+    """
+    Pairwise chi-square tests between every pair of columns of the contingency table, as symmetric matrices.
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    row_column (str): The column name of the rows in the contingency table.
+    col_column (str): The column name of the columns in the contingency table.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    correction (str, optional): 'bonferroni', 'holm', 'bh' or 'none', see adjust_pvalues. Default is 'holm'.
+
+    Returns:
+    dict[str, pd.DataFrame]: "statistic", "p_value", "adjusted_p_value" and "significant" groups x groups matrices.
+    """
+    table = pd.crosstab(df[row_column], df[col_column])
+    groups = pd.Index(table.columns, name=col_column)
+    chi2_stat, p_values, _ = _pairwise_chi2_arrays(table.to_numpy())
+    adjusted = adjust_pvalues(p_values, correction)
+    i, j = np.triu_indices(len(groups), k=1)
+    matrices = {}
+    for name, values, diagonal in [("statistic", chi2_stat, 0.0), ("p_value", p_values, 1.0), ("adjusted_p_value", adjusted, 1.0)]:
+        matrix = np.full((len(groups), len(groups)), diagonal)
+        matrix[i, j] = matrix[j, i] = values
+        matrices[name] = pd.DataFrame(matrix, index=groups, columns=groups)
+    matrices["significant"] = matrices["adjusted_p_value"] < Sig_level
+    return matrices
+
+
+def _tie_term(counts: np.ndarray) -> float:
+    counts = counts.astype(np.float64)
+    return float(np.sum(counts ** 3 - counts))
+
+
+def _pairwise_mannwhitney_pvalues(groups: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    # Each group is sorted (and its ties counted) once; every pair's U then comes from searchsorted
+    # on the sorted arrays instead of a fresh sort of the combined sample
+    sorted_groups = [np.sort(group) for group in groups]
+    uniques = [np.unique(group, return_counts=True) for group in sorted_groups]
+    tie_terms = [_tie_term(counts) for _, counts in uniques]
+    k = len(groups)
+    u_stats = np.zeros((k, k))
+    p_values = np.ones((k, k))
+    for i, j in itertools.combinations(range(k), 2):
+        x, y = sorted_groups[i], sorted_groups[j]
+        n1, n2 = len(x), len(y)
+        u1 = (np.searchsorted(y, x, side="left").sum() + np.searchsorted(y, x, side="right").sum()) / 2
+        # Ties of the combined sample: each group's own ties, with the values both groups share
+        # counted once with their summed counts (the unique arrays are sorted, so no new sort)
+        _, shared_i, shared_j = np.intersect1d(uniques[i][0], uniques[j][0], assume_unique=True, return_indices=True)
+        shared_i, shared_j = uniques[i][1][shared_i], uniques[j][1][shared_j]
+        tie_term = tie_terms[i] + tie_terms[j] + _tie_term(shared_i + shared_j) - _tie_term(shared_i) - _tie_term(shared_j)
+        n = n1 + n2
+        sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+        # Two-sided normal approximation with continuity correction, as scipy's asymptotic method
+        z = (max(u1, n1 * n2 - u1) - n1 * n2 / 2 - 0.5) / sigma if sigma > 0 else 0.0
+        u_stats[i, j], u_stats[j, i] = u1, n1 * n2 - u1
+        p_values[i, j] = p_values[j, i] = min(1.0, 2 * stats.norm.sf(z))
+    return u_stats, p_values
+
+
+def _dunn_pvalues(groups: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    # Dunn's test: all the data is ranked once and the pairs compare mean ranks
+    sizes = np.array([len(group) for group in groups], dtype=np.float64)
+    ranks = stats.rankdata(np.concatenate(groups))
+    n = ranks.size
+    mean_ranks = np.add.reduceat(ranks, np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)) / sizes
+    _, tie_counts = np.unique(ranks, return_counts=True)
+    variance = n * (n + 1) / 12 - _tie_term(tie_counts) / (12 * (n - 1))
+    z = (mean_ranks[:, None] - mean_ranks[None, :]) / np.sqrt(variance * (1 / sizes[:, None] + 1 / sizes[None, :]))
+    p_values = 2 * stats.norm.sf(np.abs(z))
+    np.fill_diagonal(p_values, 1.0)
+    return z, p_values
+
+
+@profiled
+def posthoc_pairwise(df: pd.DataFrame, column: str, group_column: str, method: str = "mannwhitney", correction: str = "holm", verbose: bool = False) -> pd.DataFrame:
+    """
+    Perform post hoc pairwise comparisons of every pair of groups after the Kruskal-Wallis H test.
+    Each group is sorted once and shared by all its pairs (Mann-Whitney U, normal approximation)
+    or all the data is ranked once (Dunn's test), and the p-values are corrected together.
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    column (str): The column name of the variable.
+    group_column (str): The column name of the groups.
+    method (str, optional): 'mannwhitney' or 'dunn'. Default is 'mannwhitney'.
+    correction (str, optional): 'bonferroni', 'holm', 'bh' or 'none', see adjust_pvalues. Default is 'holm'.
+    verbose (bool, optional): Print the p-value matrix. Default is False.
+
+    Returns:
+    pd.DataFrame: Symmetric groups x groups matrix of adjusted p-values.
+    """
+    names, groups = zip(*[(name, group[column].to_numpy(dtype=np.float64)) for name, group in df.groupby(group_column)])
+    if method == "mannwhitney":
+        _, p_values = _pairwise_mannwhitney_pvalues(list(groups))
+    elif method == "dunn":
+        _, p_values = _dunn_pvalues(list(groups))
+    else:
+        raise ValueError("method must be 'mannwhitney' or 'dunn'")
+
+    i, j = np.triu_indices(len(names), k=1)
+    adjusted = np.ones_like(p_values)
+    adjusted[i, j] = adjust_pvalues(p_values[i, j], correction)
+    adjusted[j, i] = adjusted[i, j]
+    result = pd.DataFrame(adjusted, index=pd.Index(names, name=group_column), columns=pd.Index(names, name=group_column))
+    if verbose:
+        print(f"Post hoc {method} tests for {column} by {group_column} ({correction} corrected p-values):")
+        print("======================================================================================================")
+        print(f"{result}\n")
+    return result
+
+################## End of post hoc tests for independent groups #####################################
+
+
+################## Start of batch tests over many columns #####################################
+
+def _batch_results(test: str, variables: list[str], statistic, p_values, n, Sig_level: float) -> pd.DataFrame:
+    p_values = np.asarray(p_values, dtype=np.float64)
+    return pd.DataFrame({
+        "test": test,
+        "variable": variables,
+        "statistic": np.asarray(statistic, dtype=np.float64),
+        "p_value": p_values,
+        "n": np.asarray(n, dtype=np.int64),
+        "decision": np.where(p_values < Sig_level, "Reject H0", "Fail to reject H0"),
+    }, columns=list(TestResult._fields))
+
+
+def _paired_columns(group1_columns: list[str], group2_columns: list[str]) -> list[str]:
+    if len(group1_columns) != len(group2_columns):
+        raise ValueError("group1_columns and group2_columns must have the same length")
+    return [f"{group1} & {group2}" for group1, group2 in zip(group1_columns, group2_columns)]
+
+
+@profiled
+def Shapiro__Test_batch(df: pd.DataFrame, columns: list[str], Sig_level: float = 0.05, max_n: int = 2_000) -> pd.DataFrame:
+    """
+    Shapiro__Test on many columns in one SciPy call (axis=0 over a 2-D array).
+    Null hypothesis:the data is normally distributed. 
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    columns (list[str]): The columns to be tested.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    max_n (int, optional): Only the first max_n rows are tested, as in Shapiro__Test. Default is 2_000.
+
+    Returns:
+    pd.DataFrame: One row per column with the TestResult fields.
+    """
+    values = df[columns].to_numpy(dtype=np.float64)[:max_n]
+    stat, p_values = stats.shapiro(values, axis=0)
+    return _batch_results("Shapiro-Wilk", columns, stat, p_values, [len(values)] * len(columns), Sig_level)
+
+
+@profiled
+def Kolmogorov_Smirnov_Test_batch(df: pd.DataFrame, columns: list[str], type: str = "norm", Sig_level: float = 0.05) -> pd.DataFrame:
+    """
+    Kolmogorov_Smirnov_Test on many columns in one SciPy call (axis=0 over a 2-D array).
+    Null hypothesis:the data is normally distributed. 
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    columns (list[str]): The columns to be tested.
+    type(str): The type of distribution your testing against
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+
+    Returns:
+    pd.DataFrame: One row per column with the TestResult fields.
+    """
+    values = df[columns].to_numpy(dtype=np.float64)
+    result = stats.kstest(values, type, axis=0)
+    return _batch_results("Kolmogorov-Smirnov", columns, result.statistic, result.pvalue, [len(values)] * len(columns), Sig_level)
+
+
+@profiled
+def Ordinal_Wilicoxon_1sam_batch(df: pd.DataFrame, columns: list[str], alternative_side: str = "two-sided", Sig_level: float = 0.05) -> pd.DataFrame:
+    """
+    Ordinal_Wilicoxon_1sam on many columns in one SciPy call (axis=0 over a 2-D array).
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    columns (list[str]): The columns to be tested.
+    alternative_side (str, optional): The alternative hypothesis ('two-sided', 'greater', or 'less'). Default is 'two-sided'.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+
+    Returns:
+    pd.DataFrame: One row per column with the TestResult fields.
+    """
+    values = df[columns].to_numpy(dtype=np.float64)
+    stat, p_values = stats.wilcoxon(values, alternative=alternative_side, axis=0)
+    return _batch_results("Wilcoxon signed-rank", columns, stat, p_values, [len(values)] * len(columns), Sig_level)
 
-################## End of post hoc tests for independent groups #####################################
\ No newline at end of file
+
+@profiled
+def Ttest_1sam_batch(df: pd.DataFrame, columns: list[str], POP_mean, alternative_side: str = "two-sided", Sig_level: float = 0.05) -> pd.DataFrame:
+    """
+    Ttest_1sam on many columns in one SciPy call (axis=0 over a 2-D array).
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    columns (list[str]): The columns to be tested.
+    POP_mean (float | array-like): The population mean to compare against, or one per column.
+    alternative_side (str, optional): The alternative hypothesis ('two-sided', 'greater', or 'less'). Default is 'two-sided'.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+
+    Returns:
+    pd.DataFrame: One row per column with the TestResult fields.
+    """
+    values = df[columns].to_numpy(dtype=np.float64)
+    stat, p_values = stats.ttest_1samp(values, popmean=POP_mean, alternative=alternative_side, axis=0)
+    return _batch_results("One-sample t-test", columns, stat, p_values, [len(values)] * len(columns), Sig_level)
+
+
+@profiled
+def Man_whiteny_2sam_diff_batch(df: pd.DataFrame, group1_columns: list[str], group2_columns: list[str], alternative_side: str = "two-sided", Sig_level: float = 0.05) -> pd.DataFrame:
+    """
+    Man_whiteny_2sam_diff on many pairs of columns in one SciPy call (axis=0 over 2-D arrays).
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    group1_columns (list[str]): The first group column of each pair.
+    group2_columns (list[str]): The second group column of each pair.
+    alternative_side (str, optional): The alternative hypothesis ('two-sided', 'greater', or 'less'). Default is 'two-sided'.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+
+    Returns:
+    pd.DataFrame: One row per pair of columns with the TestResult fields.
+    """
+    variables = _paired_columns(group1_columns, group2_columns)
+    stat, p_values = stats.mannwhitneyu(df[group1_columns].to_numpy(dtype=np.float64), df[group2_columns].to_numpy(dtype=np.float64), alternative=alternative_side, axis=0)
+    return _batch_results("Mann-Whitney U", variables, stat, p_values, [2 * len(df)] * len(variables), Sig_level)
+
+
+@profiled
+def Ttest_2sam_batch(df: pd.DataFrame, group1_columns: list[str], group2_columns: list[str], alternative_side: str = "two-sided", Sig_level: float = 0.05) -> pd.DataFrame:
+    """
+    Ttest_2sam on many pairs of columns in one SciPy call (axis=0 over 2-D arrays).
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    group1_columns (list[str]): The first group column of each pair.
+    group2_columns (list[str]): The second group column of each pair.
+    alternative_side (str, optional): The alternative hypothesis ('two-sided', 'greater', or 'less'). Default is 'two-sided'.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+
+    Returns:
+    pd.DataFrame: One row per pair of columns with the TestResult fields.
+    """
+    variables = _paired_columns(group1_columns, group2_columns)
+    stat, p_values = stats.ttest_ind(df[group1_columns].to_numpy(dtype=np.float64), df[group2_columns].to_numpy(dtype=np.float64), alternative=alternative_side, axis=0)
+    return _batch_results("Two-sample t-test", variables, stat, p_values, [2 * len(df)] * len(variables), Sig_level)
+
+
+@profiled
+def Wilcoxon_Ranksum_2sam_dep_batch(df: pd.DataFrame, before_columns: list[str], after_columns: list[str], alternative_side: str = "two-sided", Sig_level: float = 0.05) -> pd.DataFrame:
+    """
+    Wilcoxon_Ranksum_2sam_dep on many pairs of columns in one SciPy call (axis=0 over 2-D arrays).
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    before_columns (list[str]): The before measurement column of each pair.
+    after_columns (list[str]): The after measurement column of each pair.
+    alternative_side (str, optional): The alternative hypothesis ('two-sided', 'greater', or 'less'). Default is 'two-sided'.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+
+    Returns:
+    pd.DataFrame: One row per pair of columns with the TestResult fields.
+    """
+    variables = _paired_columns(before_columns, after_columns)
+    stat, p_values = stats.wilcoxon(df[before_columns].to_numpy(dtype=np.float64), df[after_columns].to_numpy(dtype=np.float64), alternative=alternative_side, axis=0)
+    return _batch_results("Wilcoxon signed-rank (paired)", variables, stat, p_values, [len(df)] * len(variables), Sig_level)
+
+
+@profiled
+def Paired_ttest_2sam_batch(df: pd.DataFrame, before_columns: list[str], after_columns: list[str], alternative_side: str = "two-sided", Sig_level: float = 0.05) -> pd.DataFrame:
+    """
+    Paired_ttest_2sam on many pairs of columns in one SciPy call (axis=0 over 2-D arrays).
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    before_columns (list[str]): The before measurement column of each pair.
+    after_columns (list[str]): The after measurement column of each pair.
+    alternative_side (str, optional): The alternative hypothesis ('two-sided', 'greater', or 'less'). Default is 'two-sided'.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+
+    Returns:
+    pd.DataFrame: One row per pair of columns with the TestResult fields.
+    """
+    variables = _paired_columns(before_columns, after_columns)
+    stat, p_values = stats.ttest_rel(df[before_columns].to_numpy(dtype=np.float64), df[after_columns].to_numpy(dtype=np.float64), alternative=alternative_side, axis=0)
+    return _batch_results("Paired t-test", variables, stat, p_values, [len(df)] * len(variables), Sig_level)
+
+
+@profiled
+def Fisher_2sam_batch(df: pd.DataFrame, columns: list[str], group_column: str, Sig_level: float = 0.05, method: str = "auto",
+                      n_simulations: int = 10_000, seed=None, max_paths: int = 1_000_000, workers: int = 1) -> pd.DataFrame:
+    """
+    Fisher_2sam of many categorical columns against one banner column, eg every question by region.
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    columns (list[str]): The columns of the rows of each contingency table.
+    group_column (str): The banner column.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    method, n_simulations, seed, max_paths, workers: see Fisher_2sam. The seed is split into one stream per column.
+
+    Returns:
+    pd.DataFrame: One row per column with the TestResult fields.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(columns))
+    results = [Fisher_2sam(df, column, group_column, Sig_level, False, method, n_simulations, seed_sequence, max_paths, workers)
+               for column, seed_sequence in zip(columns, seeds)]
+    return pd.DataFrame(results, columns=list(TestResult._fields))
+
+
+def _column_tie_terms(values: np.ndarray) -> np.ndarray:
+    # sum(t**3 - t) over the ties of every column, from the run lengths of the column-sorted values.
+    # NaN != NaN, so every NaN is a run of one and adds nothing
+    n, m = values.shape
+    ordered = np.sort(values, axis=0)
+    starts = np.ones((n, m), dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    positions = np.flatnonzero(starts.T.ravel())
+    runs = np.diff(np.append(positions, n * m)).astype(np.float64)
+    return np.bincount(positions // n, weights=runs ** 3 - runs, minlength=m)
+
+
+@profiled
+def group_tests_batch(df: pd.DataFrame, columns: list[str], group_columns: list[str], tests: tuple[str, ...] = ("anova", "kruskal"), Sig_level: float = 0.05) -> pd.DataFrame:
+    """
+    anova_test and kruskal_wallis_test for every outcome column by every grouping column.
+    Each grouping column is factorized once into a one-hot matrix; the ANOVA F statistics come from
+    group sums and sums of squares of all outcomes in one matrix product, and the Kruskal H statistics
+    from column-wise ranks (computed once and shared by the grouping columns), so the cost does not
+    grow with one groupby per outcome.
+    Missing outcome values and rows with a missing group are dropped per test.
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    columns (list[str]): The outcome columns.
+    group_columns (list[str]): The columns of the groups.
+    tests (tuple[str], optional): Any of "anova" and "kruskal". Default is both.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+
+    Returns:
+    pd.DataFrame: One row per test, outcome and grouping column with the TestResult fields.
+    """
+    unknown = set(tests) - {"anova", "kruskal"}
+    if unknown:
+        raise ValueError(f"Unknown tests {sorted(unknown)}, use 'anova' and/or 'kruskal'")
+    values = df[columns].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    # Centering each column first keeps the sums of squares well conditioned
+    centered = np.where(valid, values - np.nanmean(values, axis=0), 0.0)
+    squares = centered ** 2
+    valid = valid.astype(np.float64)
+    all_ranks = None
+    results = []
+    for group_column in group_columns:
+        codes, uniques = pd.factorize(df[group_column])
+        grouped = codes >= 0
+        subset = slice(None) if grouped.all() else grouped
+        one_hot = np.zeros((int(grouped.sum()), len(uniques)))
+        one_hot[np.arange(one_hot.shape[0]), codes[grouped]] = 1.0
+        counts = one_hot.T @ valid[subset]
+        n = counts.sum(axis=0)
+        k = (counts > 0).sum(axis=0)
+        variables = [f"{column} by {group_column}" for column in columns]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if "anova" in tests:
+                sums = one_hot.T @ centered[subset]
+                total = sums.sum(axis=0)
+                between = np.where(counts > 0, sums ** 2 / counts, 0.0).sum(axis=0) - total ** 2 / n
+                within = squares[subset].sum(axis=0) - between - total ** 2 / n
+                f_stat = (between / (k - 1)) / (within / (n - k))
+                results.append(_batch_results("One-way ANOVA", variables, f_stat, stats.f.sf(f_stat, k - 1, n - k), n, Sig_level))
+
+            if "kruskal" in tests:
+                # Ranks do not depend on the grouping, so they are shared unless the group has missing rows
+                if grouped.all():
+                    if all_ranks is None:
+                        all_ranks = np.nan_to_num(stats.rankdata(values, axis=0, nan_policy="omit")), _column_tie_terms(values)
+                    ranks, ties = all_ranks
+                else:
+                    ranks, ties = np.nan_to_num(stats.rankdata(values[grouped], axis=0, nan_policy="omit")), _column_tie_terms(values[grouped])
+                rank_sums = one_hot.T @ ranks
+                h_stat = 12 / (n * (n + 1)) * np.where(counts > 0, rank_sums ** 2 / counts, 0.0).sum(axis=0) - 3 * (n + 1)
+                h_stat = h_stat / (1 - ties / (n ** 3 - n))
+                results.append(_batch_results("Kruskal-Wallis H", variables, h_stat, stats.chi2.sf(h_stat, k - 1), n, Sig_level))
+    return pd.concat(results, ignore_index=True)
+
+################## End of batch tests over many columns #####################################
+
+
+################## Start of multiple comparison helpers #####################################
+
+@profiled
+def adjust_pvalues(p_values, method: str = "holm") -> np.ndarray:
+    """
+    Adjust p-values for multiple comparisons along the last axis, so many families of tests
+    (eg one per row of a table) can be corrected in one call.
+
+    Parameters:
+    p_values (array-like): p-values, the last axis holds one family of tests.
+    method (str, optional): 'bonferroni', 'holm', 'bh' (Benjamini-Hochberg) or 'none'. Default is 'holm'.
+
+    Returns:
+    np.ndarray: Adjusted p-values with the same shape as p_values.
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    m = p_values.shape[-1]
+    if method == "none" or m == 0:
+        return p_values.copy()
+    if method == "bonferroni":
+        return np.minimum(p_values * m, 1.0)
+    if method not in ["holm", "bh"]:
+        raise ValueError("method must be 'bonferroni', 'holm', 'bh' or 'none'")
+
+    order = np.argsort(p_values, axis=-1)
+    sorted_p = np.take_along_axis(p_values, order, axis=-1)
+    rank = np.arange(1, m + 1)
+    if method == "holm":
+        adjusted = np.maximum.accumulate(sorted_p * (m - rank + 1), axis=-1)
+    else:
+        adjusted = np.minimum.accumulate((sorted_p * m / rank)[..., ::-1], axis=-1)[..., ::-1]
+    adjusted = np.minimum(adjusted, 1.0)
+    result = np.empty_like(adjusted)
+    np.put_along_axis(result, order, adjusted, axis=-1)
+    return result
+
+
+@profiled
+def pairwise_proportions_ztest(counts, bases, correction: str = "holm"):
+    """
+    Two-proportion z-tests between every pair of columns for every row of a table, in one array computation.
+    Used to compare column percentages of banner tables.
+    Null hypothesis : No difference
+
+    Parameters:
+    counts (array-like): rows x columns table of counts (eg people choosing an option in each banner column).
+    bases (array-like): number of cases in each column.
+    correction (str, optional): multiple comparison correction over the column pairs of each row, see adjust_pvalues. Default is 'holm'.
+
+    Returns:
+    tuple: z statistics and adjusted p-values, both rows x columns x columns arrays.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    bases = np.asarray(bases, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proportions = counts / bases
+        pooled = (counts[:, :, None] + counts[:, None, :]) / (bases[:, None] + bases[None, :])
+        se = np.sqrt(pooled * (1 - pooled) * (1 / bases[:, None] + 1 / bases[None, :]))
+        z = (proportions[:, :, None] - proportions[:, None, :]) / se
+    z = np.where(se > 0, z, 0.0)
+    p_values = 2 * stats.norm.sf(np.abs(z))
+
+    # Correct over the unique pairs of each row, then mirror back to the full matrix
+    i, j = np.triu_indices(counts.shape[1], k=1)
+    adjusted = np.ones_like(p_values)
+    adjusted[:, i, j] = adjust_pvalues(p_values[:, i, j], correction)
+    adjusted[:, j, i] = adjusted[:, i, j]
+    return z, adjusted
+
+################## End of multiple comparison helpers #####################################
+
+
+################## Start of resampling tests (permutation and bootstrap) #####################################
+
+_RESAMPLE_DATA: dict = {}
+
+
+def _init_resample_worker(data: dict) -> None:
+    # Runs once per worker process so the data is not pickled for every batch of resamples
+    _RESAMPLE_DATA.clear()
+    _RESAMPLE_DATA.update(data)
+
+
+def _ttest_statistic(x: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    # Pooled two-sample t for every row of labels (1 = first group), from sums and sums of squares
+    n = x.size
+    n1 = labels.sum(axis=1)
+    n2 = n - n1
+    s1, q1 = labels @ x, labels @ (x * x)
+    s, q = x.sum(), (x * x).sum()
+    ss = q1 - s1 ** 2 / n1 + (q - q1) - (s - s1) ** 2 / n2
+    return (s1 / n1 - (s - s1) / n2) / np.sqrt(ss / (n - 2) * (1 / n1 + 1 / n2))
+
+
+def _group_sums(codes: np.ndarray, weights: np.ndarray | None, k: int) -> np.ndarray:
+    # Per-row group sums of a batch of code rows in one bincount
+    batch = codes.shape[0]
+    offsets = codes + k * np.arange(batch)[:, None]
+    flat_weights = None if weights is None else np.broadcast_to(weights, codes.shape).ravel()
+    return np.bincount(offsets.ravel(), weights=flat_weights, minlength=batch * k).reshape(batch, k)
+
+
+def _anova_statistic(x: np.ndarray, codes: np.ndarray, k: int) -> np.ndarray:
+    n = x.size
+    sums, counts = _group_sums(codes, x, k), _group_sums(codes, None, k)
+    correction = x.sum() ** 2 / n
+    between = (sums ** 2 / counts).sum(axis=1) - correction
+    within = (x * x).sum() - correction - between
+    return (between / (k - 1)) / (within / (n - k))
+
+
+def _chi2_statistic(row_codes: np.ndarray, col_codes: np.ndarray, R: int, C: int) -> np.ndarray:
+    batch, n = col_codes.shape
+    observed = _group_sums(np.broadcast_to(row_codes, col_codes.shape) * C + col_codes, None, R * C).reshape(batch, R, C)
+    expected = observed.sum(axis=2, keepdims=True) * observed.sum(axis=1, keepdims=True) / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(expected > 0, (observed - expected) ** 2 / expected, 0.0).sum(axis=(1, 2))
+
+
+def _resample_batch(mode: str, rng: np.random.Generator, size: int) -> np.ndarray:
+    data = _RESAMPLE_DATA
+    kind = data["kind"]
+    if kind == "ttest":
+        x, labels = data["x"], data["labels"]
+        if mode == "permutation":
+            return _ttest_statistic(x, rng.permuted(np.tile(labels, (size, 1)), axis=1))
+        n1 = int(labels.sum())
+        x1, x2 = x[:n1], x[n1:]
+        return x1[rng.integers(0, x1.size, (size, x1.size))].mean(axis=1) - x2[rng.integers(0, x2.size, (size, x2.size))].mean(axis=1)
+    if kind == "anova":
+        x, codes, k = data["x"], data["codes"], data["k"]
+        if mode == "permutation":
+            return _anova_statistic(x, rng.permuted(np.tile(codes, (size, 1)), axis=1), k)
+        # Stratified bootstrap of eta squared: x is sorted by group so each group is a contiguous block
+        starts = data["starts"]
+        sizes = np.diff(np.append(starts, x.size))
+        resampled = np.concatenate([x[start + rng.integers(0, group_size, (size, group_size))] for start, group_size in zip(starts, sizes)], axis=1)
+        sums = np.add.reduceat(resampled, starts, axis=1)
+        correction = resampled.sum(axis=1) ** 2 / x.size
+        between = (sums ** 2 / sizes).sum(axis=1) - correction
+        return between / ((resampled ** 2).sum(axis=1) - correction)
+    if kind == "fisher":
+        # Log weights -sum(log n_ij!) of random tables with the observed margins
+        return -special.gammaln(_fisher_random_tables(rng, data["rows"], data["columns"], size) + 1).sum(axis=(1, 2))
+    row_codes, col_codes, R, C = data["row_codes"], data["col_codes"], data["R"], data["C"]
+    if mode == "permutation":
+        return _chi2_statistic(row_codes, rng.permuted(np.tile(col_codes, (size, 1)), axis=1), R, C)
+    # Bootstrap of Cramer's V: resample rows, so both margins vary
+    idx = rng.integers(0, row_codes.size, (size, row_codes.size))
+    chi2_stat = _chi2_statistic(row_codes[idx], col_codes[idx], R, C)
+    return np.sqrt(chi2_stat / (row_codes.size * (min(R, C) - 1)))
+
+
+def _resample_task(task: tuple[str, int, int, np.random.SeedSequence]) -> np.ndarray:
+    mode, size, batch_size, seed_sequence = task
+    rng = np.random.default_rng(seed_sequence)
+    results = []
+    for start in range(0, size, batch_size):
+        results.append(_resample_batch(mode, rng, min(batch_size, size - start)))
+    return np.concatenate(results)
+
+
+def _run_resampling(data: dict, mode: str, n_resamples: int, seed: np.random.SeedSequence, workers: int, max_batch_bytes: int) -> np.ndarray:
+    # Resamples are split into fixed-size tasks with their own child seeds, so the result does not
+    # depend on the number of workers
+    n = max(value.size for value in data.values() if isinstance(value, np.ndarray))
+    batch_size = int(max(1, min(n_resamples, max_batch_bytes // (8 * n))))
+    task_size = batch_size * 4
+    sizes = [min(task_size, n_resamples - start) for start in range(0, n_resamples, task_size)]
+    seeds = seed.spawn(len(sizes))
+    tasks = [(mode, size, batch_size, seed_sequence) for size, seed_sequence in zip(sizes, seeds)]
+    if workers <= 1:
+        _init_resample_worker(data)
+        return np.concatenate([_resample_task(task) for task in tasks])
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_resample_worker, initargs=(data,)) as executor:
+        return np.concatenate(list(executor.map(_resample_task, tasks)))
+
+
+def _resampling_result(test: str, variable: str, data: dict, observed: float, observed_effect: float, n: int, alternative_side: str,
+                       n_resamples: int, confidence_level: float, seed, workers: int, max_batch_bytes: int, Sig_level: float, verbose: bool) -> ResamplingResult:
+    seed_sequence = np.random.SeedSequence(seed)
+    permutation_seed, bootstrap_seed = seed_sequence.spawn(2)
+    null_distribution = _run_resampling(data, "permutation", n_resamples, permutation_seed, workers, max_batch_bytes)
+    if alternative_side == "two-sided":
+        extreme = np.abs(null_distribution) >= abs(observed)
+    elif alternative_side == "greater":
+        extreme = null_distribution >= observed
+    elif alternative_side == "less":
+        extreme = null_distribution <= observed
+    else:
+        raise ValueError("alternative_side must be 'two-sided', 'greater' or 'less'")
+    p_value = (extreme.sum() + 1) / (n_resamples + 1)
+
+    bootstrap = _run_resampling(data, "bootstrap", n_resamples, bootstrap_seed, workers, max_batch_bytes)
+    alpha = (1 - confidence_level) / 2
+    ci_low, ci_high = np.nanquantile(bootstrap, [alpha, 1 - alpha])
+    if verbose:
+        print(f"{test} for {variable} ({n_resamples} resamples):")
+        print("======================================================================================================")
+        print(f"Stat: {observed}, permutation p-value: {p_value}, effect: {observed_effect}, {confidence_level:.0%} CI: ({ci_low}, {ci_high})\n")
+    return ResamplingResult(test, variable, float(observed), float(p_value), int(n), decision(p_value=float(p_value), sig_level=Sig_level, verbose=verbose),
+                            float(observed_effect), float(ci_low), float(ci_high), int(n_resamples))
+
+
+@profiled
+def Ttest_2sam_resampling(df: pd.DataFrame, group1: str, group2: str, alternative_side: str = 'two-sided', Sig_level: float = 0.05, n_resamples: int = 10_000,
+                          confidence_level: float = 0.95, seed=None, workers: int = 1, max_batch_bytes: int = 64 * 1024 ** 2, verbose: bool = True) -> ResamplingResult:
+    """
+    Permutation version of Ttest_2sam with a bootstrap confidence interval of the difference in means.
+    Used when the t-test assumptions do not hold. The resamples are generated in memory-bounded batches,
+    computed vectorized over the batch and can be spread over a process pool.
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    group1 (str): The column name for the first group.
+    group2 (str): The column name for the second group.
+    alternative_side (str, optional): The alternative hypothesis ('two-sided', 'greater', or 'less'). Default is 'two-sided'.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    n_resamples (int, optional): Number of permutations and of bootstrap resamples. Default is 10_000.
+    confidence_level (float, optional): Confidence level of the bootstrap interval. Default is 0.95.
+    seed (int, optional): Seed for reproducible results, independent of the number of workers. Default is None.
+    workers (int, optional): Number of worker processes. Default is 1.
+    max_batch_bytes (int, optional): Memory budget of one batch of resamples. Default is 64MB.
+    verbose (bool, optional): Print the test output. Default is True.
+
+    Returns:
+    ResamplingResult: t statistic, permutation p-value, mean difference and its bootstrap interval.
+    """
+    x1, x2 = df[group1].to_numpy(dtype=np.float64), df[group2].to_numpy(dtype=np.float64)
+    x1, x2 = x1[~np.isnan(x1)], x2[~np.isnan(x2)]  # A missing value would make every statistic NaN
+    x = np.concatenate([x1, x2])
+    labels = np.concatenate([np.ones(x1.size), np.zeros(x2.size)])
+    data = {"kind": "ttest", "x": x, "labels": labels}
+    observed = _ttest_statistic(x, labels[None, :])[0]
+    return _resampling_result("Two-sample permutation t-test", f"{group1} & {group2}", data, observed, x1.mean() - x2.mean(), x.size, alternative_side,
+                              n_resamples, confidence_level, seed, workers, max_batch_bytes, Sig_level, verbose)
+
+
+@profiled
+def anova_resampling(df: pd.DataFrame, column: str, group_column: str, Sig_level: float = 0.05, n_resamples: int = 10_000, confidence_level: float = 0.95,
+                     seed=None, workers: int = 1, max_batch_bytes: int = 64 * 1024 ** 2, verbose: bool = True) -> ResamplingResult:
+    """
+    Permutation version of anova_test with a bootstrap confidence interval of eta squared.
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    column (str): variable to test
+    group_column (str): The column name of the groups.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    n_resamples, confidence_level, seed, workers, max_batch_bytes, verbose: see Ttest_2sam_resampling.
+
+    Returns:
+    ResamplingResult: F statistic, permutation p-value, eta squared and its (stratified) bootstrap interval.
+    """
+    x = df[column].to_numpy(dtype=np.float64)
+    keep = df[group_column].notna().to_numpy() & ~np.isnan(x)  # groupby in anova_test leaves out missing groups too
+    codes, _ = pd.factorize(df[group_column][keep], sort=True)
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+    x = x[keep][order]
+    k = int(codes.max()) + 1
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    data = {"kind": "anova", "x": x, "codes": codes, "k": k, "starts": starts}
+    observed = _anova_statistic(x, codes[None, :], k)[0]
+    eta_squared = observed * (k - 1) / (observed * (k - 1) + (x.size - k))
+    return _resampling_result("One-way permutation ANOVA", f"{column} by {group_column}", data, observed, eta_squared, x.size, "greater",
+                              n_resamples, confidence_level, seed, workers, max_batch_bytes, Sig_level, verbose)
+
+
+@profiled
+def chi2_independence_resampling(df: pd.DataFrame, row_column: str, col_column: str, Sig_level: float = 0.05, n_resamples: int = 10_000, confidence_level: float = 0.95,
+                                 seed=None, workers: int = 1, max_batch_bytes: int = 64 * 1024 ** 2, verbose: bool = True) -> ResamplingResult:
+    """
+    Permutation version of chi2_independence_test with a bootstrap confidence interval of Cramer's V.
+    Null hypothesis : No difference
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the data.
+    row_column (str): The column name of the rows in the contingency table.
+    col_column (str): The column name of the columns in the contingency table.
+    Sig_level (float, optional): The significance level for the test. Default is 0.05.
+    n_resamples, confidence_level, seed, workers, max_batch_bytes, verbose: see Ttest_2sam_resampling.
+
+    Returns:
+    ResamplingResult: chi2 statistic, permutation p-value, Cramer's V and its bootstrap interval.
+    """
+    row_codes, row_levels = pd.factorize(df[row_column], sort=True)
+    col_codes, col_levels = pd.factorize(df[col_column], sort=True)
+    keep = (row_codes >= 0) & (col_codes >= 0)  # pd.crosstab leaves out missing values too
+    row_codes, col_codes = row_codes[keep], col_codes[keep]
+    R, C = len(row_levels), len(col_levels)
+    data = {"kind": "chi2", "row_codes": row_codes, "col_codes": col_codes, "R": R, "C": C}
+    observed = _chi2_statistic(row_codes, col_codes[None, :], R, C)[0]
+    cramers_v = np.sqrt(observed / (row_codes.size * (min(R, C) - 1)))
+    return _resampling_result("Chi-square permutation test of independence", f"{row_column} & {col_column}", data, observed, cramers_v, row_codes.size, "greater",
+                              n_resamples, confidence_level, seed, workers, max_batch_bytes, Sig_level, verbose)
+
+################## End of resampling tests (permutation and bootstrap) #####################################
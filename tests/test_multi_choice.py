@@ -0,0 +1,149 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import multi_choice
+
+
+def _two_groups()->pd.DataFrame:
+    # A: 1000 cases, 30% pick Q/1. B: 100 cases, 60% pick Q/1
+    return pd.DataFrame({
+        "G": ["A"] * 1000 + ["B"] * 100,
+        "Q/1": [1] * 300 + [0] * 700 + [1] * 60 + [0] * 40,
+        "Q/2": [0] * 1000 + [1] * 100,
+    })
+
+
+def test_significance_letters_sit_next_to_column_percentages():
+    df = _two_groups()
+    table = multi_choice.get_mr_table_by(df, "G", ["Q/1", "Q/2"], significance="holm")
+    assert table.loc["Q/1", "A"] == pytest.approx(0.3)
+    assert table.loc["Q/1", "B"] == pytest.approx(0.6)
+    assert table.loc["Q/1", "B [B]"] == "A"
+    tables = multi_choice.get_mr_tables_by_all(df, "G", ["Q/"], significance="holm")
+    pd.testing.assert_frame_equal(tables[("G", "Q/")], table)
+    with pytest.raises(ValueError):
+        multi_choice.get_mr_tables_by_all(df, "G", ["Q/"], percentages="row", significance="holm")
+
+
+def test_compact_dtypes_keeps_missing_values_outside_option_columns():
+    df = pd.DataFrame({
+        "Q/1": [1, None, 0],
+        "empty": [None, None, None],
+        "skipped": [1, None, 0],
+        "flag": [1, 0, 1],
+    }, dtype="float64")
+    compact = multi_choice.compact_dtypes(df)
+    assert compact["Q/1"].dtype == "uint8" and compact["Q/1"].tolist() == [1, 0, 0]
+    assert compact["flag"].dtype == "uint8"
+    assert compact["empty"].isna().all()
+    assert compact["skipped"].isna().sum() == 1
+
+
+def _export(n_rows:int=2_000, seed:int=0)->pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({f"Q{i}/{j}": rng.integers(0, 2, n_rows).astype(np.uint8) for i in range(4) for j in range(1, 5)})
+    df["Gender"] = rng.choice(["Female", "Male"], n_rows)
+    df["Region"] = rng.choice(["East", "North", "West"], n_rows)
+    return df
+
+
+def test_mr_tab_all_matches_mr_tab_for_every_dtype():
+    df = _export()
+    df["Q1/1"] = df["Q1/1"].astype(float)
+    df.loc[::9, "Q1/1"] = np.nan
+    df["Q2/2"] = df["Q2/2"].astype("Int64")
+    df.loc[::5, "Q2/2"] = pd.NA
+    prefixes = [f"Q{i}/" for i in range(4)]
+    tables = multi_choice.mr_tab_all(df, prefixes)
+    for prefix in prefixes:
+        # mr_tab sums uint8 columns as uint64, mr_tab_all always gives int64 counts
+        pd.testing.assert_frame_equal(tables[prefix], multi_choice.mr_tab(multi_choice.filter_data(df, prefix)), check_dtype=False)
+        assert tables[prefix]["Frequency"].dtype == (np.float64 if prefix == "Q1/" else np.int64)
+
+
+def test_significance_letters_beyond_z_are_unambiguous():
+    # 30 catergories whose share of Q/1 rises steadily, so the last one is higher than all the others
+    rows = []
+    for i in range(30):
+        rows += [{"G": f"g{i:02d}", "Q/1": int(j < 10 + 2 * i), "Q/2": int(j >= 10 + 2 * i)} for j in range(100)]
+    table = multi_choice.get_mr_table_by(pd.DataFrame(rows), "G", ["Q/1", "Q/2"], significance="none")
+    assert "g26 [AA]" in table.columns and "g29 [AD]" in table.columns
+    higher = table.loc["Q/1", "g29 [AD]"].split(",")
+    labels = {multi_choice._column_letter(i) for i in range(30)}
+    assert "A" in higher and set(higher) <= labels and len(higher) == len(set(higher))
+
+
+def test_banner_tables_counted_in_chunks_match_groupby(monkeypatch):
+    df = _export()
+    df.loc[::7, "Region"] = None
+    df["weight"] = np.random.default_rng(1).uniform(0.5, 2.0, len(df))
+    monkeypatch.setattr(multi_choice, "_COUNT_CHUNK_BYTES", 1_000)  # A few rows per chunk
+    tables = multi_choice.get_mr_tables_by_all(df, ["Gender", "Region"], ["Q0/", "Q3/"])
+    weighted = multi_choice.get_mr_tables_by_all(df, ["Gender", "Region"], ["Q0/"], weights="weight")
+    for index_col in ["Gender", "Region"]:
+        cols = [f"Q0/{j}" for j in range(1, 5)]
+        counts = df.groupby(index_col)[cols].sum()
+        table = tables[(index_col, "Q0/")]
+        assert table["Total_Response"].dtype == np.int64
+        np.testing.assert_array_equal(table["Total_Response"].to_numpy(), counts.sum(axis=0).to_numpy())
+        np.testing.assert_allclose(table[list(counts.index)].to_numpy(), (counts / counts.sum(axis=0)).T.to_numpy())
+        weighted_counts = df[cols].mul(df["weight"], axis=0).groupby(df[index_col]).sum()
+        np.testing.assert_allclose(weighted[(index_col, "Q0/")]["Total_Response"].to_numpy(), weighted_counts.sum(axis=0).to_numpy())
+
+
+def test_incremental_report_matches_full_recompute(tmp_path):
+    df = _export(3_000)
+    df["Q1/1"] = df["Q1/1"].astype(float)
+    df.loc[::11, "Q1/1"] = np.nan
+    prefixes, banners = [f"Q{i}/" for i in range(4)], ["Gender", "Region"]
+    cache_dir = str(tmp_path / "cache")
+
+    def check(data, expected_status):
+        frequencies, banner_tables, status = multi_choice.incremental_report(data, prefixes, banners, cache_dir)
+        assert status == expected_status
+        for prefix, table in multi_choice.mr_tab_all(data, prefixes).items():
+            pd.testing.assert_frame_equal(frequencies[prefix], table)
+        full = multi_choice.get_mr_tables_by_all(data, banners, prefixes)
+        assert set(banner_tables) == set(full)
+        for key, table in full.items():
+            pd.testing.assert_frame_equal(banner_tables[key], table)
+
+    check(df.iloc[:2_000], dict.fromkeys(prefixes, "recomputed"))
+    check(df.iloc[:2_000], dict.fromkeys(prefixes, "unchanged"))
+    # New submissions, one of them from a region the cached counts never saw
+    appended = df.copy()
+    appended.loc[2_500, "Region"] = "South"
+    check(appended, dict.fromkeys(prefixes, "appended"))
+    edited = appended.copy()
+    edited.loc[10, "Q2/3"] = 1 - edited.loc[10, "Q2/3"]
+    check(edited, {**dict.fromkeys(prefixes, "unchanged"), "Q2/": "recomputed"})
+
+
+def test_load_data_needs_a_sheet_to_compact_or_cache_an_xlsx(tmp_path):
+    path = str(tmp_path / "export.xlsx")
+    _export(20).to_excel(path, sheet_name="data", index=False)
+    for options in [{"compact": True}, {"cache": True}]:
+        with pytest.raises(ValueError, match="sheet_name"):
+            multi_choice.load_data(path, show_head=False, **options)
+    assert isinstance(multi_choice.load_data(path, show_head=False), dict)  # Every sheet, as pd.read_excel
+    df = multi_choice.load_data(path, "data", show_head=False, compact=True, cache=True)
+    assert df["Q0/1"].dtype == np.uint8
+    pd.testing.assert_frame_equal(multi_choice.load_data(path, "data", show_head=False, compact=True, cache=True), df)
+
+
+def test_report_writer_takes_the_format_from_the_extension(tmp_path):
+    table = pd.DataFrame({"Frequency": [1, 2]}, index=["a", "b"])
+    for extension in ["xlsx", "csv", "parquet"]:
+        report = multi_choice.ReportWriter(str(tmp_path / f"out.{extension}"))
+        assert report.output_format == extension
+        report.add(table, "Q/")
+        report.write()
+    assert os.path.isfile(tmp_path / "out.xlsx")
+    assert os.path.isfile(tmp_path / "out.parquet" / "Q.parquet")
+    assert multi_choice.ReportWriter(str(tmp_path / "results")).output_format == "csv"
+    with pytest.raises(ValueError, match=".json"):
+        multi_choice.ReportWriter(str(tmp_path / "out.json"))
+    assert multi_choice.ReportWriter(str(tmp_path / "out.json"), "csv").output_format == "csv"
@@ -0,0 +1,14 @@
+import benchmarks
+import profiling
+
+
+def test_benchmarks_and_profiles_flag_regressions_the_same_way():
+    baseline = {"seconds": 1.0, "peak_memory_bytes": 1_000}
+    slower = {"seconds": 1.5, "peak_memory_bytes": 1_000}
+    comparison = benchmarks.compare({"results": [{"name": "mr_tab", "rows": 10, **slower}]}, {"results": [{"name": "mr_tab", "rows": 10, **baseline}]})
+    spans = profiling.compare({"spans": {"mr_tab": {"calls": 1, **slower}}}, {"spans": {"mr_tab": {"calls": 1, **baseline}, "gone": {"calls": 1, **baseline}}})
+    assert comparison[0]["regression"] and spans[1]["regression"]
+    assert comparison[0]["time_ratio"] == spans[1]["time_ratio"] == 1.5
+    assert spans[0] == {"name": "gone", "calls": None, "baseline_calls": 1, "regression": None}
+    # Slow downs under min_seconds are timer noise
+    assert not profiling.compare_timings({"seconds": 0.0015, "peak_memory_bytes": 0}, {"seconds": 0.001, "peak_memory_bytes": 0})["regression"]
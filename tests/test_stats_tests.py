@@ -0,0 +1,100 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import special, stats
+
+import stats_tests
+
+
+def test_anderson_darling_sketch_rejects_heavy_tails():
+    # A2 in the hundreds, where D'Agostino's approximation no longer holds
+    values = np.random.default_rng(0).standard_t(8, 300_000)
+    result = stats_tests.Anderson_Darling_Test_sketch(pd.DataFrame({"x": values}), "x", seed=0, verbose=False)
+    expected = stats.anderson(values, "norm", method="interpolate").statistic
+    assert abs(result.statistic - expected) / expected < 0.01
+    assert result.p_value == 0.0
+    assert result.decision == "Reject H0"
+
+
+def test_sketch_tests_match_exact_tests_on_millions_of_rows():
+    values = np.random.default_rng(1).standard_normal(3_000_000)
+    chunks = (pd.DataFrame({"x": values[i:i + 250_000]}) for i in range(0, values.size, 250_000))
+    ks = stats_tests.Kolmogorov_Smirnov_Test_sketch(chunks, "x", seed=1, verbose=False)
+    exact = stats.kstest(values, "norm")
+    # The sketch error has to stay well below the 1 / sqrt(n) resolution of the statistic
+    assert abs(ks.statistic - exact.statistic) < 0.2 / np.sqrt(values.size)
+    assert ks.decision == ("Reject H0" if exact.pvalue < 0.05 else "Fail to reject H0")
+
+    ad = stats_tests.Anderson_Darling_Test_sketch(pd.DataFrame({"x": values}), "x", seed=1, verbose=False)
+    assert abs(ad.statistic - stats.anderson(values, "norm", method="interpolate").statistic) < 0.05
+
+
+def test_resampling_tests_leave_out_missing_values():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"x": rng.normal(size=300), "y": rng.normal(size=300), "group": rng.choice(["a", "b", "c"], 300)})
+    df.loc[::10, "x"] = np.nan
+    df.loc[::7, "group"] = None
+    complete = df.dropna()
+
+    anova = stats_tests.anova_resampling(df, "x", "group", n_resamples=500, seed=0, verbose=False)
+    expected = stats.f_oneway(*[group["x"].to_numpy() for _, group in complete.groupby("group")])
+    assert anova.n == len(complete)
+    assert anova.statistic == pytest.approx(expected.statistic)
+    assert anova.p_value == pytest.approx(expected.pvalue, abs=0.03)
+
+    ttest = stats_tests.Ttest_2sam_resampling(df, "x", "y", n_resamples=500, seed=0, verbose=False)
+    assert ttest.n == df["x"].count() + df["y"].count()
+    assert ttest.p_value == pytest.approx(stats.ttest_ind(df["x"].dropna(), df["y"]).pvalue, abs=0.05)
+
+
+
+def _tables_with_margins(rows:tuple, columns:tuple):
+    # Every non negative integer table with these margins, filled a column at a time
+    if len(columns) == 1:
+        yield [[row] for row in rows]
+        return
+    for column in itertools.product(*(range(row + 1) for row in rows)):
+        if sum(column) == columns[0]:
+            for rest in _tables_with_margins(tuple(r - c for r, c in zip(rows, column)), columns[1:]):
+                yield [[c] + row for c, row in zip(column, rest)]
+
+
+def _brute_force_fisher(table:np.ndarray)->float:
+    def log_probability(cells):
+        return -special.gammaln(np.asarray(cells) + 1).sum()
+    observed = log_probability(table)
+    probabilities = np.array([log_probability(cells) for cells in _tables_with_margins(tuple(table.sum(axis=1)), tuple(table.sum(axis=0)))])
+    return np.exp(probabilities[probabilities <= observed + 1e-7]).sum() / np.exp(probabilities).sum()
+
+
+@pytest.mark.parametrize("table", [
+    [[3, 0, 2], [1, 4, 0], [0, 2, 5]],
+    [[2, 2, 1, 0], [0, 1, 3, 4]],
+    [[1, 0], [2, 3], [0, 4], [3, 1]],
+    [[2, 2, 2], [2, 2, 2]],
+])
+def test_fisher_exact_rxc_matches_brute_force(table):
+    table = np.array(table)
+    assert stats_tests._fisher_exact_rxc(table) == pytest.approx(_brute_force_fisher(table), rel=1e-9)
+
+
+def test_fisher_auto_stays_exact_when_merged_paths_fit():
+    # Generates more than max_paths paths before they are merged, but keeps far fewer
+    table = np.array([[27, 10, 12, 5], [0, 2, 7, 0], [2, 7, 15, 13]])
+    df = pd.DataFrame({"row": np.repeat(np.arange(3), table.sum(axis=1)),
+                       "column": np.concatenate([np.repeat(np.arange(4), counts) for counts in table])})
+    result = stats_tests.Fisher_2sam(df, "row", "column", verbose=False)
+    assert result.test == "Fisher's exact"
+    assert result.p_value == pytest.approx(stats_tests._fisher_exact_rxc(table))
+
+
+def test_posthoc_mannwhitney_matches_scipy_with_ties():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({"score": rng.integers(0, 6, 900).astype(float), "group": rng.choice(["a", "b", "c"], 900)})
+    df.loc[df["group"] == "c", "score"] += 1  # Partly overlapping values
+    result = stats_tests.posthoc_pairwise(df, "score", "group", correction="none")
+    for first, second in [("a", "b"), ("a", "c"), ("b", "c")]:
+        expected = stats.mannwhitneyu(df.loc[df["group"] == first, "score"], df.loc[df["group"] == second, "score"], method="asymptotic")
+        assert result.loc[first, second] == pytest.approx(expected.pvalue, rel=1e-9)
@@ -0,0 +1,66 @@
+import os
+
+import pandas as pd
+import pytest
+
+import tete_utils
+from tete_utils import ExcelCache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    ExcelCache.clear()
+    max_bytes = ExcelCache.max_bytes
+    yield
+    ExcelCache.set_max_bytes(max_bytes)
+    ExcelCache.set_cache_dir(None)
+    ExcelCache.clear()
+
+
+def write_form(path, labels:dict[str, str], list_name:str="colours")->str:
+    choices = pd.DataFrame({"list_name": list_name, "name": list(labels), "label": list(labels.values())})
+    survey = pd.DataFrame({"type": [f"select_one {list_name}"], "name": ["q1"], "label": ["Question 1"]})
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        survey.to_excel(writer, sheet_name="survey", index=False)
+        choices.to_excel(writer, sheet_name="choices", index=False)
+    return str(path)
+
+
+def test_index_hits_count_and_keep_the_workbook_most_recently_used(tmp_path):
+    form_a = write_form(tmp_path / "a.xlsx", {"1": "Red", "2": "Blue"})
+    form_b = write_form(tmp_path / "b.xlsx", {"1": "Green", "2": "Yellow"})
+    tete_utils.get_encoding_dict("colours", form_b)
+    for _ in range(5):
+        assert tete_utils.get_encoding_dict("colours", form_a) == {1: "Red", 2: "Blue"}
+    assert ExcelCache.stats()["hits"] >= 4
+    ExcelCache.set_max_bytes(300)
+    assert [key[0] for key in ExcelCache._cache] == [os.path.abspath(form_a)]
+    # The encoding index counts towards the byte budget
+    assert ExcelCache.stats()["bytes"] > ExcelCache._workbook_bytes(ExcelCache._cache[next(iter(ExcelCache._cache))])
+
+
+def test_decode_dataframe_leaves_codes_with_blank_labels_missing(tmp_path):
+    form = write_form(tmp_path / "form.xlsx", {"1": "Red", "2": None, "3": "Blue"})
+    df = pd.DataFrame({"q1": [1, 2, 3, 4, None]})
+    decoded = tete_utils.decode_dataframe(df, form, {"q1": "colours"})
+    assert list(decoded["q1"].cat.categories) == ["Red", "Blue"]
+    assert decoded["q1"].tolist()[0] == "Red" and decoded["q1"].tolist()[2] == "Blue"
+    assert decoded["q1"].isna().tolist() == [False, True, False, True, True]
+
+
+@pytest.mark.parametrize("max_bytes", [None, 1])
+def test_alternating_workbooks_never_serve_the_other_files_sheets(tmp_path, max_bytes):
+    form_a = write_form(tmp_path / "a.xlsx", {"1": "Red", "2": "Blue"})
+    form_b = write_form(tmp_path / "b.xlsx", {"1": "Green", "2": "Yellow", "3": "Pink"})
+    ExcelCache.set_cache_dir(str(tmp_path / "cache"))
+    if max_bytes is not None:
+        ExcelCache.set_max_bytes(max_bytes)  # Evicts on every load, so sheets come back from the disk cache
+    for _ in range(3):
+        assert ExcelCache.get_sheet(form_a, "choices")["label"].tolist() == ["Red", "Blue"]
+        assert ExcelCache.get_sheet(form_b, "choices")["label"].tolist() == ["Green", "Yellow", "Pink"]
+        assert tete_utils.get_encoding_dict("colours", form_a) == {1: "Red", 2: "Blue"}
+        assert tete_utils.get_encoding_dict("colours", form_b) == {1: "Green", 2: "Yellow", 3: "Pink"}
+    # Rewriting a workbook in place changes its modification time and size, so the old sheets are not reused
+    write_form(tmp_path / "a.xlsx", {"1": "Black", "2": "White", "3": "Grey", "4": "Brown"})
+    assert ExcelCache.get_sheet(form_a, "choices")["label"].tolist() == ["Black", "White", "Grey", "Brown"]
+    assert tete_utils.get_encoding_dict("colours", form_a) == {1: "Black", 2: "White", 3: "Grey", 4: "Brown"}
@@ -1,46 +1,284 @@
 import os
+import hashlib
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 import logging
+if __package__:
+    from .profiling import profiled
+else:
+    from profiling import profiled
+
+# Applications choose where the messages go, eg logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def load_keyed_pickle(path: str, key):
+    """Returns the payload saved to path by save_keyed_pickle, or None if the file is missing,
+    unreadable or was saved under another key (eg the source file changed since)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            stored_key, payload = pickle.load(f)
+    except Exception as e:
+        logger.warning("Ignoring unreadable cache file %s: %s", path, e)
+        return None
+    if stored_key != key:
+        return None
+    return payload
+
+
+def save_keyed_pickle(path: str, key, payload) -> None:
+    """Pickles (key, payload) to path, creating its directory. Failures are logged, not raised."""
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((key, payload), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # Atomic, so concurrent readers never see partial files
+    except OSError as e:
+        logger.warning("Could not write cache file %s: %s", path, e)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 class ExcelCache:
-    _cache = None
-    _last_modified = None
+    """Thread-safe LRU cache of parsed Excel sheets.
 
-    @classmethod
-    def get_sheet(cls, file_location: str, sheet_name: str) -> pd.DataFrame | None:
+    Sheets are parsed lazily, one at a time, the first time they are requested and
+    cached per workbook. Workbooks are keyed by (absolute path, mtime, size) so
+    alternating between files never serves the wrong sheets, and a changed file is
+    reloaded. The least recently used workbooks are evicted once the total in-memory
+    size of the cached sheets exceeds `max_bytes`.
+
+    If `cache_dir` is set, parsed sheets and encoding indexes are also pickled to
+    disk so that new processes can skip parsing the Excel file altogether.
+    """
+    max_bytes: int = 512 * 1024 * 1024
+    cache_dir: str | None = None
+    _cache: "OrderedDict[tuple[str, float, int], dict[str, pd.DataFrame]]" = OrderedDict()
+    _sizes: dict[tuple[str, float, int], int] = {}
+    _indexes: dict[tuple[tuple[str, float, int], str], dict[str, dict]] = {}
+    _sheet_name_lists: dict[tuple[str, float, int], list[str]] = {}
+    _lock = threading.RLock()
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @staticmethod
+    def _file_key(file_location: str) -> tuple[str, float, int]:
         if not os.path.exists(file_location):
-            logging.error("File does not exist: %s", file_location)
+            logger.error("File does not exist: %s", file_location)
             raise FileNotFoundError(f"File not found: {file_location}")
-        
-        modified_time = os.path.getmtime(file_location)
-        
-        # Reload if file has changed or cache is empty
-        if cls._cache is None or modified_time != cls._last_modified:
-            logging.info("Loading Excel file: %s", file_location)
-            cls._cache = pd.read_excel(file_location, sheet_name=None)  # Read all sheets into memory
-            cls._last_modified = modified_time
-
-        if sheet_name not in cls._cache:
-            logging.error("Sheet not found: %s", sheet_name)
-            raise KeyError(f"Sheet '{sheet_name}' not found in the file.")
-        
-        return cls._cache[sheet_name]
+        stat = os.stat(file_location)
+        return (os.path.abspath(file_location), stat.st_mtime, stat.st_size)
+
+    @staticmethod
+    def _workbook_bytes(workbook: dict[str, pd.DataFrame]) -> int:
+        return int(sum(df.memory_usage(deep=True).sum() for df in workbook.values()))
+
+    @staticmethod
+    def _index_bytes(value) -> int:
+        # Approximate size of an encoding index: the nested dicts plus their keys and values
+        if isinstance(value, dict):
+            return sys.getsizeof(value) + sum(sys.getsizeof(k) + ExcelCache._index_bytes(v) for k, v in value.items())
+        return sys.getsizeof(value)
+
+    @classmethod
+    def _entry_bytes(cls, key: tuple[str, float, int]) -> int:
+        indexes = [index for (index_key, _), index in cls._indexes.items() if index_key == key]
+        return cls._workbook_bytes(cls._cache.get(key, {})) + sum(cls._index_bytes(index) for index in indexes)
+
+    @staticmethod
+    def _kind(prefix: str, sheet_name: str) -> str:
+        return f"{prefix}-{hashlib.sha1(sheet_name.encode('utf-8')).hexdigest()[:12]}"
+
+    @classmethod
+    def _disk_path(cls, key: tuple[str, float, int], kind: str) -> str | None:
+        if cls.cache_dir is None:
+            return None
+        digest = hashlib.sha1(key[0].encode("utf-8")).hexdigest()
+        return os.path.join(cls.cache_dir, f"{digest}.{kind}.pkl")
+
+    @classmethod
+    def _load_from_disk(cls, key: tuple[str, float, int], kind: str):
+        path = cls._disk_path(key, kind)
+        if path is None:
+            return None
+        return load_keyed_pickle(path, key)  # None if the source workbook changed since the file was written
+
+    @classmethod
+    def _save_to_disk(cls, key: tuple[str, float, int], kind: str, payload) -> None:
+        path = cls._disk_path(key, kind)
+        if path is not None:
+            save_keyed_pickle(path, key, payload)
+
+    @classmethod
+    def _drop(cls, key: tuple[str, float, int]) -> None:
+        cls._cache.pop(key, None)
+        cls._sizes.pop(key, None)
+        cls._sheet_name_lists.pop(key, None)
+        for index_key in [k for k in cls._indexes if k[0] == key]:
+            del cls._indexes[index_key]
+
+    @classmethod
+    def _evict(cls) -> None:
+        # Always keep the most recently used workbook, even if it alone exceeds the budget
+        while len(cls._cache) > 1 and sum(cls._sizes.values()) > cls.max_bytes:
+            key = next(iter(cls._cache))
+            cls._drop(key)
+            cls.evictions += 1
+            logger.info("Evicted Excel file from cache: %s", key[0])
+
+    @classmethod
+    def _entry(cls, key: tuple[str, float, int]) -> dict[str, pd.DataFrame]:
+        if key not in cls._cache:
+            # Drop stale entries for the same path (file has been modified)
+            for stale in [k for k in cls._cache if k[0] == key[0]]:
+                cls._drop(stale)
+            cls._cache[key] = {}
+            cls._sizes[key] = 0
+        cls._cache.move_to_end(key)
+        return cls._cache[key]
+
+    @classmethod
+    def _sheet_names(cls, file_location: str, key: tuple[str, float, int]) -> list[str]:
+        # Kept next to the workbook's sheets, so a miss does not open the workbook twice
+        if key in cls._sheet_name_lists:
+            return cls._sheet_name_lists[key]
+        sheet_names = cls._load_from_disk(key, "sheet_names")
+        if sheet_names is None:
+            with pd.ExcelFile(file_location) as excel_file:
+                sheet_names = [str(name) for name in excel_file.sheet_names]
+            cls._save_to_disk(key, "sheet_names", sheet_names)
+        cls._sheet_name_lists[key] = sheet_names
+        return sheet_names
+
+    @classmethod
+    @profiled
+    def get_sheet(cls, file_location: str, sheet_name: str) -> pd.DataFrame | None:
+        key = cls._file_key(file_location)
+        with cls._lock:
+            sheets = cls._entry(key)
+            if sheet_name in sheets:
+                cls.hits += 1
+                return sheets[sheet_name]
+
+            cls.misses += 1
+            df = cls._load_from_disk(key, cls._kind("sheet", sheet_name))
+            if df is None:
+                if sheet_name not in cls._sheet_names(file_location, key):
+                    logger.error("Sheet not found: %s", sheet_name)
+                    raise KeyError(f"Sheet '{sheet_name}' not found in the file.")
+                logger.info("Loading sheet '%s' of Excel file: %s", sheet_name, file_location)
+                # Only the requested sheet is parsed; openpyxl streams it in read-only mode
+                df = pd.read_excel(file_location, sheet_name=sheet_name)
+                cls._save_to_disk(key, cls._kind("sheet", sheet_name), df)
+            else:
+                logger.info("Loaded sheet '%s' from disk cache: %s", sheet_name, file_location)
+
+            sheets[sheet_name] = df
+            cls._sizes[key] = cls._entry_bytes(key)
+            cls._evict()
+            return df
+
+    @classmethod
+    def get_workbook(cls, file_location: str) -> dict[str, pd.DataFrame]:
+        """Returns every sheet of the workbook, loading the ones not yet cached."""
+        key = cls._file_key(file_location)
+        with cls._lock:
+            return {name: cls.get_sheet(file_location, name) for name in cls._sheet_names(file_location, key)}  # type:ignore
+
+    @classmethod
+    def get_encoding_index(cls, file_location: str, sheet_name: str = "choices") -> dict[str, dict]:
+        """Returns the choices sheet grouped once into `list_name -> {name: label}` lookups.
+
+        The index holds a "str" variant (names as stored in the sheet) and a "number"
+        variant (names cast to int). Lists whose names are not numeric map to None in
+        the "number" variant. The index is built once per cached workbook.
+        """
+        key = cls._file_key(file_location)
+        with cls._lock:
+            index_key = (key, sheet_name)
+            if index_key in cls._indexes:
+                cls.hits += 1
+                cls._entry(key)  # Marks the workbook as the most recently used
+                return cls._indexes[index_key]
+            index = cls._load_from_disk(key, cls._kind("index", sheet_name))
+            if index is None:
+                # get_sheet counts the hit or miss of the sheet
+                index = _build_encoding_index(cls.get_sheet(file_location, sheet_name))  # type:ignore
+                cls._save_to_disk(key, cls._kind("index", sheet_name), index)
+            else:
+                cls.misses += 1
+            cls._entry(key)
+            cls._indexes[index_key] = index
+            cls._sizes[key] = cls._entry_bytes(key)  # The index counts towards the byte budget too
+            cls._evict()
+            return index
+
+    @classmethod
+    def set_max_bytes(cls, max_bytes: int) -> None:
+        """Sets the memory budget in bytes and evicts workbooks that no longer fit."""
+        with cls._lock:
+            cls.max_bytes = max_bytes
+            cls._evict()
+
+    @classmethod
+    def set_cache_dir(cls, cache_dir: str | None) -> None:
+        """Enables the on-disk cache in `cache_dir`, or disables it when None."""
+        with cls._lock:
+            cls.cache_dir = cache_dir
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        """Returns the hit/miss/eviction counters and current cache usage."""
+        with cls._lock:
+            return {
+                "hits": cls.hits,
+                "misses": cls.misses,
+                "evictions": cls.evictions,
+                "entries": len(cls._cache),
+                "bytes": sum(cls._sizes.values()),
+                "max_bytes": cls.max_bytes,
+            }
+
+    @classmethod
+    def clear(cls) -> None:
+        """Empties the cache and resets the counters."""
+        with cls._lock:
+            cls._cache.clear()
+            cls._sizes.clear()
+            cls._indexes.clear()
+            cls._sheet_name_lists.clear()
+            cls.hits = cls.misses = cls.evictions = 0
 
 def get_list_names(df: pd.DataFrame):
     if "list_name" in df.columns:
         return df["list_name"].unique().tolist()
-    logging.error("'list_name' column not found in DataFrame")
+    logger.error("'list_name' column not found in DataFrame")
     raise KeyError("'list_name' column not found in DataFrame")
 
+def _build_encoding_index(df: pd.DataFrame) -> dict[str, dict]:
+    get_list_names(df)  # Validates the 'list_name' column
+    str_index: dict = {}
+    number_index: dict = {}
+    for list_name, group in df.groupby("list_name", sort=False):
+        str_index[list_name] = dict(zip(group["name"], group["label"]))
+        try:
+            number_index[list_name] = dict(zip(group["name"].astype(int), group["label"]))
+        except (ValueError, TypeError):
+            number_index[list_name] = None
+    return {"str": str_index, "number": number_index}
+
 def filter_df(df: pd.DataFrame, filter_option: str):
     if filter_option in get_list_names(df):
         return df.query("list_name == @filter_option")[["name", "label"]]
-    logging.error("Filter option '%s' not found in 'list_name' column", filter_option)
+    logger.error("Filter option '%s' not found in 'list_name' column", filter_option)
     raise KeyError(f"Filter option '{filter_option}' not found in 'list_name' column")
 
+@profiled
 def get_encoding_dict(selection_option: str, file_location: str, sheet_name: str = "choices", encodings_type: str = "str") -> dict:
     """
     Retrieves the encoding labels of a given selection option and returns a dictionary.
@@ -52,21 +290,108 @@ def get_encoding_dict(selection_option: str, file_location: str, sheet_name: str
         encodings_type (str, optional): "str" for string encoding, "number" for numeric encoding.
     """
     try:
-        dataframe = ExcelCache.get_sheet(file_location, sheet_name)
-        df_filtered = filter_df(dataframe, selection_option)
-        return_dict = {}
-        
-        for name, label in zip(df_filtered.name, df_filtered.label):
-            if encodings_type == "str":
-                return_dict[name] = label
-            elif encodings_type == "number":
-                return_dict[int(name)] = label  # Ensure numeric encoding
-                
-        return return_dict
+        encodings = ExcelCache.get_encoding_index(file_location, sheet_name)[encodings_type]
+        if selection_option not in encodings:
+            logger.error("Filter option '%s' not found in 'list_name' column", selection_option)
+            raise KeyError(f"Filter option '{selection_option}' not found in 'list_name' column")
+        if encodings[selection_option] is None:
+            raise ValueError(f"Names of '{selection_option}' cannot be converted to numbers")
+        return dict(encodings[selection_option])
     
     except (KeyError, FileNotFoundError) as e:
-        logging.error("Error retrieving encoding dictionary: %s", e)
+        logger.error("Error retrieving encoding dictionary: %s", e)
+        return {}  # Return empty dict on error
+
+@profiled
+def get_all_encodings(file_location: str, sheet_name: str = "choices", encodings_type: str = "str") -> dict[str, dict]:
+    """
+    Retrieves the encoding labels of every selection option in the questionnaire at once.
+    
+    Args:
+        file_location (str): Location of the Excel file.
+        sheet_name (str, optional): Sheet name where the encoding is stored. Defaults to "choices".
+        encodings_type (str, optional): "str" for string encoding, "number" for numeric encoding.
+
+    Returns:
+        dict: Mapping of selection option to its {name: label} dictionary. With numeric encoding,
+        selection options whose names are not numbers are left out.
+    """
+    try:
+        encodings = ExcelCache.get_encoding_index(file_location, sheet_name)[encodings_type]
+        return {list_name: dict(mapping) for list_name, mapping in encodings.items() if mapping is not None}
+
+    except (KeyError, FileNotFoundError) as e:
+        logger.error("Error retrieving encodings: %s", e)
         return {}  # Return empty dict on error
 
+def _code_key(value) -> str:
+    # Normalises codes so 1, 1.0 and "1" all match the choice name "1"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+def _decode_select_one(column: pd.Series, encodings: dict) -> pd.Categorical:
+    # Choices with a blank label cannot be categories, their codes become missing like unknown codes
+    labels = list(dict.fromkeys(label for label in encodings.values() if not pd.isna(label)))
+    label_position = {label: i for i, label in enumerate(labels)}
+    lookup = {_code_key(name): label_position[label] for name, label in encodings.items() if not pd.isna(label)}
+    codes, uniques = pd.factorize(column)
+    # Only the distinct codes are looked up in Python; the rows are mapped with one take
+    unique_codes = np.array([lookup.get(_code_key(u), -1) for u in uniques] + [-1], dtype=np.int64)
+    return pd.Categorical.from_codes(unique_codes[codes], categories=labels)
+
+def _decode_select_multiple(column: pd.Series, encodings: dict) -> pd.DataFrame:
+    names = [_code_key(name) for name in encodings]
+    name_position = {name: i for i, name in enumerate(names)}
+    codes, uniques = pd.factorize(column)
+    # One-hot rows for each distinct answer string, plus an all-zero row for missing answers
+    unique_rows = np.zeros((len(uniques) + 1, len(names)), dtype=np.uint8)
+    for i, answer in enumerate(uniques):
+        for selected in str(answer).split():
+            if _code_key(selected) in name_position:
+                unique_rows[i, name_position[_code_key(selected)]] = 1
+    return pd.DataFrame(
+        unique_rows[codes],
+        columns=[f"{column.name}/{name}" for name in names],
+        index=column.index,
+    )
+
+@profiled
+def decode_dataframe(df: pd.DataFrame, form_path: str, column_to_list_map: dict[str, str], select_multiple: list[str] | None = None, sheet_name: str = "choices") -> pd.DataFrame:
+    """
+    Decodes coded survey data using the choices of the XLSForm.
+
+    select_one columns become `pd.Categorical` columns of labels. select_multiple columns
+    (space separated choice names) are expanded into one uint8 column per choice named
+    "Question/option", the layout expected by `filter_data` and `mr_tab`.
+
+    Args:
+        df (pd.DataFrame): Survey data to decode.
+        form_path (str): Location of the XLSForm Excel file.
+        column_to_list_map (dict[str, str]): Maps each column of df to its selection option (list_name).
+        select_multiple (list[str], optional): Columns of column_to_list_map that are select_multiple questions.
+        sheet_name (str, optional): Sheet name where the encoding is stored. Defaults to "choices".
+
+    Returns:
+        pd.DataFrame: Decoded copy of df. Codes not found in the choices, or whose label is blank, become NaN.
+    """
+    encodings = ExcelCache.get_encoding_index(form_path, sheet_name)["str"]
+    select_multiple = select_multiple or []
+    pieces: list[pd.Series | pd.DataFrame] = []
+    for col in df.columns:
+        if col not in column_to_list_map:
+            pieces.append(df[col])
+            continue
+        list_name = column_to_list_map[col]
+        if list_name not in encodings:
+            logger.error("Filter option '%s' not found in 'list_name' column", list_name)
+            raise KeyError(f"Filter option '{list_name}' not found in 'list_name' column")
+        if col in select_multiple:
+            pieces.append(_decode_select_multiple(df[col], encodings[list_name]))
+        else:
+            pieces.append(pd.Series(_decode_select_one(df[col], encodings[list_name]), index=df.index, name=col))
+    return pd.concat(pieces, axis=1)
+
 if __name__ == "__main__":
-    logging.info("Main execution started")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logger.info("Main execution started")